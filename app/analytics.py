@@ -3,9 +3,35 @@ Conversation Analytics Module
 Tracks agent performance metrics for optimization.
 """
 import json
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+
+def build_session(state: Dict, turn_count: int, session_id: Optional[str] = None) -> Dict:
+    """
+    Build the analytics record for a completed conversation.
+    
+    Args:
+        state: Final agent state
+        turn_count: Number of conversation turns
+        session_id: Optional identifier (e.g. a batch conversation ID)
+        
+    Returns:
+        Session record
+    """
+    session = {
+        'timestamp': datetime.now().isoformat(),
+        'turns': turn_count,
+        'lead_captured': state.get('tool_called', False),
+        'lead_info': state.get('lead_info', {}),
+        'final_intent': state.get('intent', ''),
+        'completed': turn_count < 10  # Assuming max 10 turns
+    }
+    if session_id is not None:
+        session['session_id'] = session_id
+    return session
 
 
 class ConversationAnalytics:
@@ -37,29 +63,31 @@ class ConversationAnalytics:
     def _save_sessions(self):
         """Save sessions to file."""
         try:
-            with open(self.log_file, 'w') as f:
+            # Write then rename so an interrupted save never corrupts the log
+            tmp_file = self.log_file.with_name(self.log_file.name + ".tmp")
+            with open(tmp_file, 'w') as f:
                 json.dump(self.sessions, f, indent=2)
+            os.replace(tmp_file, self.log_file)
         except Exception as e:
             print(f"Warning: Could not save analytics: {e}")
     
-    def log_session(self, state: Dict, turn_count: int):
+    def log_session(self, state: Dict, turn_count: int, session_id: Optional[str] = None, save: bool = True):
         """
         Log a completed conversation session.
         
         Args:
             state: Final agent state
             turn_count: Number of conversation turns
+            session_id: Optional identifier (e.g. a batch conversation ID)
+            save: Write to disk now; pass False when logging many sessions
+                and call flush() afterwards
         """
-        session = {
-            'timestamp': datetime.now().isoformat(),
-            'turns': turn_count,
-            'lead_captured': state.get('tool_called', False),
-            'lead_info': state.get('lead_info', {}),
-            'final_intent': state.get('intent', ''),
-            'completed': turn_count < 10  # Assuming max 10 turns
-        }
-        
-        self.sessions.append(session)
+        self.sessions.append(build_session(state, turn_count, session_id))
+        if save:
+            self._save_sessions()
+    
+    def flush(self):
+        """Save sessions logged with save=False."""
         self._save_sessions()
     
     def get_stats(self) -> Dict:
@@ -109,6 +137,87 @@ class ConversationAnalytics:
         print("="*50 + "\n")
 
 
+class AnalyticsLog(ConversationAnalytics):
+    """
+    Append-only JSONL analytics sink for large batch runs.
+    
+    Each session is appended as one line as it is logged; only running
+    totals stay in memory, so memory and write cost do not grow with the
+    number of sessions.
+    """
+    
+    def __init__(self, log_file: str = "batch_analytics.jsonl"):
+        """Open the log, recomputing totals from any existing sessions."""
+        self.log_file = Path(log_file)
+        self.sessions: List[Dict] = []  # never populated
+        self.totals = {'total': 0, 'captured': 0, 'completed': 0, 'success_turns': 0}
+        self._load_totals()
+    
+    def _load_totals(self):
+        """Stream existing sessions, dropping a partial line left by a crash."""
+        if not self.log_file.exists():
+            return
+        
+        with open(self.log_file, 'rb+') as f:
+            valid_end = 0
+            for line in iter(f.readline, b''):
+                if not line.endswith(b'\n'):
+                    break
+                valid_end = f.tell()
+                self._add(json.loads(line))
+            f.truncate(valid_end)
+    
+    def _add(self, session: Dict):
+        """Add a session to the running totals."""
+        self.totals['total'] += 1
+        self.totals['completed'] += int(bool(session['completed']))
+        if session['lead_captured']:
+            self.totals['captured'] += 1
+            self.totals['success_turns'] += session['turns']
+    
+    def log_session(self, state: Dict, turn_count: int, session_id: Optional[str] = None,
+                    save: bool = True, **fields):
+        """
+        Append a completed conversation session.
+        
+        Args:
+            state: Final agent state
+            turn_count: Number of conversation turns
+            session_id: Optional identifier (e.g. a batch conversation ID)
+            save: Ignored; sessions are always appended immediately
+            **fields: Extra fields stored with the session (e.g. batch line index)
+        """
+        session = build_session(state, turn_count, session_id)
+        session.update(fields)
+        
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(session) + "\n")
+        self._add(session)
+    
+    def flush(self):
+        """Sessions are written as they are logged; nothing to do."""
+    
+    def get_stats(self) -> Dict:
+        """
+        Calculate aggregate statistics from the running totals.
+        
+        Returns:
+            Dictionary with analytics metrics
+        """
+        total = self.totals['total']
+        captured = self.totals['captured']
+        if not total:
+            return super().get_stats()
+        
+        return {
+            'total_conversations': total,
+            'leads_captured': captured,
+            'conversion_rate': f"{(captured/total*100):.1f}%",
+            'avg_turns_to_conversion': round(self.totals['success_turns'] / captured, 1) if captured else 0,
+            'completion_rate': f"{(self.totals['completed']/total*100):.1f}%"
+        }
+
+
 # Example usage
 if __name__ == "__main__":
     # Demo
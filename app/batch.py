@@ -0,0 +1,422 @@
+"""
+Batch Transcript Runner
+Re-runs stored conversations through the agent offline, in parallel.
+
+Input is JSONL, one conversation per line:
+    {"conversation_id": "abc", "turns": ["hi", "what are your plans?", ...]}
+or with chat-style messages (only user messages are replayed):
+    {"conversation_id": "abc", "messages": [{"role": "user", "content": "hi"}, ...]}
+An optional "tenant" field selects that tenant's knowledge base.
+
+Usage:
+    python app/batch.py transcripts.jsonl results.jsonl --workers 8
+
+Results are appended to the output file as conversations finish. A
+checkpoint next to the output records how far the input has been fully
+processed, so rerunning the same command resumes where it stopped.
+Analytics sessions are tagged with the run's ID, so several batches can
+share one analytics log and --restart only removes its own sessions.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from app.graph import create_graph
+from app.state import AgentState
+from app.analytics import AnalyticsLog
+from app.transcripts import user_messages
+from app.llm.budget import turn_budget
+
+
+def read_lines(path: Path, start_offset: int = 0, start_index: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Stream input lines without loading the file into memory.
+
+    Args:
+        path: Input JSONL file
+        start_offset: Byte offset to start reading at
+        start_index: Line index of the line at start_offset
+
+    Yields:
+        (line index, byte offset just past the line, raw line)
+    """
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        index = start_index
+        for line in iter(f.readline, b''):
+            yield index, f.tell(), line
+            index += 1
+
+
+def run_conversation(graph, conversation: Dict, turn_budget_seconds: float) -> Dict:
+    """
+    Replay one conversation through the graph.
+
+    Args:
+        graph: Compiled graph
+        conversation: Parsed JSONL record
+        turn_budget_seconds: Per-turn latency budget
+
+    Returns:
+        Result record with per-turn intent and response plus final lead state
+    """
+    state: AgentState = {
+        'messages': [],
+        'intent': '',
+        'lead_info': {},
+        'tool_called': False,
+        'collecting_lead': False,
+        'degraded': False,
+        'tenant': conversation.get('tenant', '')
+    }
+    turns = []
+
+    for message in user_messages(conversation):
+        state['messages'].append(HumanMessage(content=message))
+        with turn_budget(turn_budget_seconds):
+            state = graph.invoke(state)
+
+        reply = state['messages'][-1]
+        turns.append({
+            'user': message,
+            'intent': state.get('intent', ''),
+            'agent': reply.content if getattr(reply, 'type', '') == 'ai' else None,
+            'degraded': bool(state.get('degraded'))
+        })
+
+    return {
+        'turns': turns,
+        'final_intent': state.get('intent', ''),
+        'lead_info': state.get('lead_info', {}),
+        'lead_captured': bool(state.get('tool_called'))
+    }
+
+
+def load_checkpoint(path: Path) -> Dict:
+    """
+    Load the batch checkpoint.
+
+    Returns:
+        Dictionary with 'run_id' (tags this run's analytics sessions),
+        'index' (last line index such that every line up to it is finished,
+        -1 if none) and 'offset' (input byte offset after it), or None if
+        there is no checkpoint yet
+    """
+    if path.exists():
+        with open(path, 'r') as f:
+            return json.load(f)
+    return None
+
+
+def save_checkpoint(path: Path, checkpoint: Dict):
+    """Atomically write the batch checkpoint."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def scan_finished(output_path: Path, after_index: int) -> Dict[int, Dict]:
+    """
+    Find results already written past the checkpoint.
+
+    Also drops a trailing partial line left by an interrupted write.
+
+    Args:
+        output_path: Output JSONL file
+        after_index: Checkpointed line index
+
+    Returns:
+        Mapping of line index to result record for indices > after_index
+    """
+    finished = {}
+    if not output_path.exists():
+        return finished
+
+    with open(output_path, 'rb+') as f:
+        valid_end = 0
+        for line in iter(f.readline, b''):
+            if not line.endswith(b'\n'):
+                break
+            valid_end = f.tell()
+            record = json.loads(line)
+            if record['index'] > after_index:
+                finished[record['index']] = record
+        f.truncate(valid_end)
+
+    return finished
+
+
+def logged_indices(analytics_path: Path, run_id: str, after_index: int) -> set:
+    """
+    Find batch line indices this run already logged past the checkpoint.
+
+    Args:
+        analytics_path: AnalyticsLog JSONL file (may be shared with other runs)
+        run_id: Checkpointed run ID
+        after_index: Checkpointed line index
+
+    Returns:
+        Line indices > after_index of sessions logged by this run
+    """
+    logged = set()
+    if not analytics_path.exists():
+        return logged
+
+    with open(analytics_path, 'rb') as f:
+        for line in f:
+            session = json.loads(line)
+            if session.get('run_id') == run_id and session['index'] > after_index:
+                logged.add(session['index'])
+    return logged
+
+
+def remove_run(analytics_path: Path, run_id: str):
+    """
+    Remove one run's sessions from an analytics log, keeping everything else.
+
+    The log is streamed into a temporary file that then replaces it, so
+    no other batch should be writing to it at the same time.
+
+    Args:
+        analytics_path: AnalyticsLog JSONL file
+        run_id: Run whose sessions to remove
+    """
+    if not analytics_path.exists():
+        return
+
+    tmp_path = analytics_path.with_name(analytics_path.name + ".tmp")
+    with open(analytics_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for line in src:
+            if not line.endswith(b'\n'):
+                break  # partial line left by a crash
+            if json.loads(line).get('run_id') != run_id:
+                dst.write(line)
+    os.replace(tmp_path, analytics_path)
+
+
+def _raise(message: str):
+    """Surface an input error as a failed conversation."""
+    raise ValueError(message)
+
+
+def _log_analytics(analytics: AnalyticsLog, logged: set, run_id: str, record: Dict):
+    """Feed a finished conversation into analytics once."""
+    if record.get('error') or record['index'] in logged:
+        return
+
+    analytics.log_session(
+        {
+            'tool_called': record['lead_captured'],
+            'lead_info': record['lead_info'],
+            'intent': record['final_intent']
+        },
+        turn_count=len(record['turns']),
+        session_id=str(record['conversation_id']),
+        run_id=run_id,
+        index=record['index']
+    )
+
+
+def run_batch(
+    input_path: Path,
+    output_path: Path,
+    workers: int = 4,
+    turn_budget_seconds: float = 30.0,
+    analytics_file: str = "batch_analytics.jsonl",
+    checkpoint_every: int = 100,
+    restart: bool = False,
+    graph=None
+) -> Dict:
+    """
+    Run every conversation in a JSONL file through the agent.
+
+    Memory stays bounded regardless of file size: lines are streamed, at
+    most `workers * 2` conversations are in flight, and only finished
+    results past the checkpoint are held while slower ones complete.
+
+    Args:
+        input_path: Input JSONL file
+        output_path: Output JSONL file (appended to)
+        workers: Worker threads running conversations
+        turn_budget_seconds: Per-turn latency budget
+        analytics_file: AnalyticsLog JSONL file (appended to; may be shared)
+        checkpoint_every: Conversations between checkpoint saves
+        restart: Discard previous progress and this run's analytics sessions,
+            and start over
+        graph: Compiled graph (created if not given)
+
+    Returns:
+        Summary with processed, skipped and failed counts and throughput
+    """
+    checkpoint_path = output_path.with_name(output_path.name + ".checkpoint")
+    analytics_path = Path(analytics_file)
+    if restart:
+        previous = load_checkpoint(checkpoint_path)
+        if previous is not None:
+            remove_run(analytics_path, previous['run_id'])
+        for path in [output_path, checkpoint_path]:
+            if path.exists():
+                path.unlink()
+
+    graph = graph or create_graph()
+    analytics = AnalyticsLog(log_file=analytics_file)
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        # Save the run ID before logging anything so a restart can find its sessions
+        checkpoint = {'run_id': uuid.uuid4().hex, 'index': -1, 'offset': 0}
+        save_checkpoint(checkpoint_path, checkpoint)
+    run_id = checkpoint['run_id']
+
+    # Results written after the checkpoint may or may not have reached analytics
+    already_finished = scan_finished(output_path, checkpoint['index'])
+    logged = logged_indices(analytics_path, run_id, checkpoint['index'])
+    for record in already_finished.values():
+        _log_analytics(analytics, logged, run_id, record)
+
+    # Finished line index -> input offset after it, for lines past the watermark
+    finished_offsets = {index: record['input_offset'] for index, record in already_finished.items()}
+    skip = set(already_finished)
+    max_window = workers * 16
+
+    summary = {'processed': 0, 'skipped': len(already_finished), 'failed': 0}
+    since_checkpoint = 0
+    started = time.perf_counter()
+
+    def advance_watermark():
+        while checkpoint['index'] + 1 in finished_offsets:
+            checkpoint['index'] += 1
+            checkpoint['offset'] = finished_offsets.pop(checkpoint['index'])
+
+    def collect(done, out):
+        nonlocal since_checkpoint
+        for future in done:
+            index, offset, conversation_id = pending.pop(future)
+            record = {'index': index, 'input_offset': offset, 'conversation_id': conversation_id}
+            try:
+                record.update(future.result())
+            except Exception as e:
+                record.update({'error': str(e), 'turns': []})
+                summary['failed'] += 1
+
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            _log_analytics(analytics, logged, run_id, record)
+
+            summary['processed'] += 1
+            finished_offsets[index] = offset
+            since_checkpoint += 1
+
+        advance_watermark()
+        if since_checkpoint >= checkpoint_every:
+            save_checkpoint(checkpoint_path, checkpoint)
+            since_checkpoint = 0
+
+    pending = {}
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        lines = read_lines(input_path, checkpoint['offset'], checkpoint['index'] + 1)
+
+        for index, offset, line in lines:
+            if index in skip:
+                skip.discard(index)
+                continue
+
+            if not line.strip():
+                finished_offsets[index] = offset
+                advance_watermark()
+                continue
+
+            # Keep in-flight work and out-of-order results bounded
+            while pending and (len(pending) >= workers * 2 or len(finished_offsets) >= max_window):
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done, out)
+
+            try:
+                conversation = json.loads(line)
+            except json.JSONDecodeError as e:
+                conversation = {'conversation_id': f"line-{index}", 'error': f"Invalid JSON: {e}"}
+            if not isinstance(conversation, dict):
+                conversation = {'conversation_id': f"line-{index}",
+                                'error': f"Expected a JSON object, got {type(conversation).__name__}"}
+
+            conversation_id = conversation.get('conversation_id', f"line-{index}")
+            if 'error' in conversation:
+                future = pool.submit(_raise, conversation['error'])
+            else:
+                future = pool.submit(run_conversation, graph, conversation, turn_budget_seconds)
+            pending[future] = (index, offset, conversation_id)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done, out)
+
+    save_checkpoint(checkpoint_path, checkpoint)
+
+    elapsed = time.perf_counter() - started
+    summary['elapsed_s'] = round(elapsed, 2)
+    summary['conversations_per_s'] = round(summary['processed'] / elapsed, 2) if elapsed else 0
+    return summary
+
+
+def main():
+    """Parse arguments and run the batch."""
+    parser = argparse.ArgumentParser(description="Re-run stored transcripts through the AutoStream agent")
+    parser.add_argument("input", help="Input JSONL file of conversations")
+    parser.add_argument("output", help="Output JSONL file of results (appended; resumed on rerun)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--turn-budget", type=float, default=30.0, help="Per-turn latency budget in seconds")
+    parser.add_argument("--analytics-file", default="batch_analytics.jsonl")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--restart", action="store_true", help="Discard previous progress and this run's analytics sessions")
+    parser.add_argument("--fake-llm", action="store_true",
+                        help="Use the local fake LLM instead of Gemini (dry run)")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+
+    if args.fake_llm:
+        from app.llm.fake import FakeLLM, scripted_responder
+        from app.llm.scheduler import LLMScheduler, set_scheduler
+
+        fake = FakeLLM(responder=scripted_responder)
+        set_scheduler(LLMScheduler(
+            client_factory=lambda temperature: fake,
+            rate_per_minute=1_000_000,
+            max_in_flight=args.workers * 2
+        ))
+    elif not os.getenv("GOOGLE_API_KEY"):
+        print("ERROR: GOOGLE_API_KEY not found in environment variables.")
+        print("Set it in .env, or pass --fake-llm for a dry run.")
+        return
+
+    summary = run_batch(
+        Path(args.input),
+        Path(args.output),
+        workers=args.workers,
+        turn_budget_seconds=args.turn_budget,
+        analytics_file=args.analytics_file,
+        checkpoint_every=args.checkpoint_every,
+        restart=args.restart
+    )
+
+    print(f"Processed {summary['processed']} conversations "
+          f"({summary['skipped']} already done, {summary['failed']} failed) "
+          f"in {summary['elapsed_s']}s - {summary['conversations_per_s']} conversations/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Local Fallback Rules
+Cheap keyword, regex and gazetteer rules used when the LLM is slow or down.
+"""
+import re
+from typing import Optional
+
+
+# Phrases that mark a message as a question rather than lead info
+QUESTION_INDICATORS = [
+    '?', 'what', 'how', 'why', 'when', 'where',
+    'tell me', 'explain', 'about', 'can you', 'could you'
+]
+
+GREETING_WORDS = ['hi', 'hello', 'hey', 'hiya', 'howdy', 'greetings', 'good morning',
+                  'good afternoon', 'good evening', 'how are you']
+
+HIGH_INTENT_PHRASES = [
+    'want to try', 'like to try', 'try the', 'sign up', 'signup', 'sign me up',
+    'get started', 'interested', 'subscribe', 'buy', 'purchase', 'i want the',
+    "i'll take", 'ready to start'
+]
+
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+
+# Gazetteer: lowercase alias -> canonical platform name
+PLATFORMS = {
+    'instagram': 'Instagram',
+    'insta': 'Instagram',
+    'ig': 'Instagram',
+    'youtube': 'YouTube',
+    'yt': 'YouTube',
+    'tiktok': 'TikTok',
+    'tik tok': 'TikTok',
+    'facebook': 'Facebook',
+    'fb': 'Facebook',
+    'twitter': 'Twitter',
+    'linkedin': 'LinkedIn',
+    'twitch': 'Twitch',
+    'snapchat': 'Snapchat',
+    'pinterest': 'Pinterest'
+}
+
+NAME_PATTERNS = [
+    r"\bmy name is ([a-z][a-z'-]*(?: [a-z][a-z'-]*)?)",
+    r"\bi'?m ([a-z][a-z'-]*(?: [a-z][a-z'-]*)?)",
+    r"\bi am ([a-z][a-z'-]*(?: [a-z][a-z'-]*)?)",
+    r"\bthis is ([a-z][a-z'-]*(?: [a-z][a-z'-]*)?)",
+    r"\bcall me ([a-z][a-z'-]*(?: [a-z][a-z'-]*)?)",
+    r"\bit'?s ([a-z][a-z'-]*(?: [a-z][a-z'-]*)?)"
+]
+
+# Words that can follow "i'm" or stand alone without being a name
+NOT_NAMES = {
+    'yes', 'no', 'ok', 'okay', 'sure', 'fine', 'good', 'great', 'thanks',
+    'interested', 'ready', 'not', 'just', 'here', 'looking', 'a', 'the',
+    'and', 'from', 'with', 'on', 'in', 'at', 'by', 'quit', 'exit',
+    # Pronouns
+    'i', 'me', 'my', 'you', 'your', 'we', 'us', 'he', 'she', 'it', 'they',
+    'this', 'that', 'there', 'so', 'what', 'why', 'how', 'who',
+    # Common verbs
+    'think', 'thinking', 'guess', 'know', 'want', 'need', 'like', 'love',
+    'have', 'do', 'does', 'did', 'can', 'will', 'would', 'is', 'are', 'am',
+    'was', 'be', 'go', 'going', 'get', 'try', 'trying', 'tell', 'help',
+    'maybe', 'please',
+    # Greetings
+    'hi', 'hey', 'hello', 'hiya', 'yo', 'morning', 'afternoon', 'evening',
+    'bye', 'goodbye', 'cheers'
+}
+
+
+def _normalize(message: str) -> str:
+    """Lowercase and replace typographic apostrophes."""
+    return message.lower().replace('’', "'").strip()
+
+
+def is_question(message: str) -> bool:
+    """
+    Detect whether a message is a question rather than requested info.
+
+    Args:
+        message: User message
+
+    Returns:
+        True if any question indicator appears
+    """
+    text = _normalize(message)
+    return any(indicator in text for indicator in QUESTION_INDICATORS)
+
+
+def classify_intent_by_keywords(message: str) -> str:
+    """
+    Classify intent with keyword rules.
+
+    Args:
+        message: User message
+
+    Returns:
+        'greeting', 'inquiry' or 'high_intent'
+    """
+    text = _normalize(message)
+
+    if any(phrase in text for phrase in HIGH_INTENT_PHRASES):
+        return 'high_intent'
+
+    # Short greetings only - "hello, what does Pro cost?" is an inquiry
+    words = re.findall(r"[a-z']+", text)
+    opening = " ".join(words[:3])
+    is_small_talk = '?' not in text or 'how are you' in text
+    if is_small_talk and len(words) <= 5 and any(
+        opening == greeting or opening.startswith(greeting + " ") for greeting in GREETING_WORDS
+    ):
+        return 'greeting'
+
+    return 'inquiry'
+
+
+def extract_email(message: str) -> Optional[str]:
+    """
+    Extract the first email address from a message.
+
+    Args:
+        message: User message
+
+    Returns:
+        Email address or None
+    """
+    emails = re.findall(EMAIL_PATTERN, message)
+    return emails[0] if emails else None
+
+
+def extract_platform(message: str) -> Optional[str]:
+    """
+    Find a known social media platform in a message.
+
+    Args:
+        message: User message
+
+    Returns:
+        Canonical platform name or None
+    """
+    text = _normalize(message)
+    for alias, platform in PLATFORMS.items():
+        if re.search(rf"\b{re.escape(alias)}\b", text):
+            return platform
+
+    # A bare "X" is the only safe way to read Twitter's new name
+    if text.strip(' .!') == 'x':
+        return 'Twitter'
+    return None
+
+
+def extract_name(message: str) -> Optional[str]:
+    """
+    Extract a person's name with introduction patterns.
+
+    Falls back to treating a one- or two-word all-letters message as the
+    name itself, since it is usually a direct answer to "May I have your
+    name?"; pronouns, common verbs and greetings ("I think so", "hey
+    there") are not taken as names.
+
+    Args:
+        message: User message
+
+    Returns:
+        Name as written by the user, or None
+    """
+    text = _normalize(message)
+    original = message.replace('’', "'").strip()
+
+    for pattern in NAME_PATTERNS:
+        match = re.search(pattern, text)
+        if match:
+            words = []
+            for word in match.group(1).split():
+                if word in NOT_NAMES:
+                    break
+                words.append(word)
+            if words:
+                start = match.start(1)
+                return original[start:start + len(" ".join(words))]
+
+    words = re.findall(r"[A-Za-z'-]+", original)
+    if 1 <= len(words) <= 2 and len(words) == len(original.split()):
+        if not any(word.lower() in NOT_NAMES for word in words):
+            return " ".join(words)
+
+    return None
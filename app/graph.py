@@ -71,10 +71,13 @@ def should_execute_tool(state: AgentState) -> str:
         return 'end'
 
 
-def create_graph():
+def create_graph(profiler=None):
     """
     Create and compile the LangGraph workflow.
     
+    Args:
+        profiler: Optional MemoryProfiler (app.profiling) that wraps every node
+    
     Returns:
         Compiled graph ready for execution
     """
@@ -82,11 +85,17 @@ def create_graph():
     workflow = StateGraph(AgentState)
     
     # Add nodes (renamed to avoid state key conflicts)
-    workflow.add_node("intent_classifier", intent_node)
-    workflow.add_node("greet", greeting_node)
-    workflow.add_node("rag_answer", rag_node)
-    workflow.add_node("lead_qualifier", lead_node)
-    workflow.add_node("execute_tool", tool_node)
+    nodes = {
+        "intent_classifier": intent_node,
+        "greet": greeting_node,
+        "rag_answer": rag_node,
+        "lead_qualifier": lead_node,
+        "execute_tool": tool_node
+    }
+    for name, node in nodes.items():
+        if profiler is not None:
+            node = profiler.wrap_node(name, node)
+        workflow.add_node(name, node)
     
     # Set entry point
     workflow.set_entry_point("intent_classifier")
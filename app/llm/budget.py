@@ -0,0 +1,43 @@
+"""
+Turn Latency Budget
+Per-turn deadline shared by every LLM call made while answering one message.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+_turn_deadline: ContextVar[Optional[float]] = ContextVar('turn_deadline', default=None)
+
+
+@contextmanager
+def turn_budget(seconds: float):
+    """
+    Bound the LLM time spent on one conversation turn.
+
+    LLM calls made inside the block get at most the remaining budget as
+    their deadline; once it is spent they fail immediately so nodes can
+    fall back to local rules.
+
+    Args:
+        seconds: Latency budget for the turn
+    """
+    token = _turn_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """
+    Seconds left in the current turn's budget.
+
+    Returns:
+        Remaining seconds (may be negative), or None outside a turn budget
+    """
+    deadline = _turn_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
@@ -0,0 +1,157 @@
+"""
+Fake LLM
+Local stand-in for the Gemini client with configurable latency and errors.
+"""
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from langchain_core.messages import AIMessage
+
+from app.fallbacks import (
+    classify_intent_by_keywords,
+    extract_name,
+    extract_email,
+    extract_platform
+)
+
+
+class FakeLLMError(Exception):
+    """Simulated provider error."""
+
+
+def parse_latency(spec: str, seed: Optional[int] = None) -> Callable[[], float]:
+    """
+    Build a latency sampler from a short spec string.
+
+    Supported specs:
+        - "0.5": constant seconds
+        - "uniform:LOW,HIGH": uniform between LOW and HIGH seconds
+        - "lognormal:MEDIAN,SIGMA": log-normal with the given median (heavy tail)
+        - "exp:MEAN": exponential with the given mean
+
+    Args:
+        spec: Latency spec
+        seed: Random seed for reproducible sampling
+
+    Returns:
+        Callable returning a latency in seconds
+    """
+    rng = random.Random(seed)
+    kind, _, params = spec.partition(':')
+
+    if not params:
+        value = float(kind)
+        return lambda: value
+
+    values = [float(v) for v in params.split(',')]
+
+    if kind == 'uniform':
+        low, high = values
+        return lambda: rng.uniform(low, high)
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda: median * rng.lognormvariate(0, sigma)
+    if kind == 'exp':
+        mean, = values
+        return lambda: rng.expovariate(1 / mean)
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _quoted(prompt: str) -> str:
+    """The quoted user message in an extraction prompt."""
+    match = re.search(r'message: "(.*?)"\n', prompt, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def scripted_responder(prompt: str) -> str:
+    """
+    Answer the agent's prompts plausibly without a model.
+
+    Recognizes the intent, extraction and RAG prompts used by the nodes
+    and answers them with the local fallback rules, so conversations
+    progress the same way they would against Gemini.
+
+    Args:
+        prompt: Prompt text
+
+    Returns:
+        Response text
+    """
+    if prompt.startswith("Classify the user's intent"):
+        message = re.search(r'User message: "(.*)"', prompt, re.DOTALL)
+        return classify_intent_by_keywords(message.group(1) if message else "")
+
+    extractors = {
+        "Extract the person's name": extract_name,
+        "Extract the email address": extract_email,
+        "Extract the social media platform": extract_platform
+    }
+    for marker, extractor in extractors.items():
+        if prompt.startswith(marker):
+            return extractor(_quoted(prompt)) or "NOT_FOUND"
+
+    context = re.search(r"Context:\n(.*?)\n\n", prompt, re.DOTALL)
+    if context:
+        return f"Based on our information: {context.group(1)}"
+
+    return "This is a fake response."
+
+
+class FakeLLM:
+    """
+    Drop-in replacement for ChatGoogleGenerativeAI.invoke.
+
+    No network calls - sleeps for a configurable latency, fails at a
+    configurable rate, and otherwise answers with `responder(prompt)`.
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Callable[[], float]] = 0.0,
+        error_rate: float = 0.0,
+        responder: Optional[Callable[[str], str]] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Initialize fake LLM.
+
+        Args:
+            latency: Seconds per call, or a callable returning seconds
+            error_rate: Probability (0-1) that a call raises FakeLLMError
+            responder: Function mapping prompt to response text
+            seed: Random seed for reproducible error injection
+        """
+        self.latency = latency if callable(latency) else (lambda: latency)
+        self.error_rate = error_rate
+        self.responder = responder or (lambda prompt: "This is a fake response.")
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt: str) -> AIMessage:
+        """
+        Simulate an LLM call.
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            AIMessage with the responder's output
+
+        Raises:
+            FakeLLMError: At the configured error rate
+        """
+        with self.lock:
+            self.calls += 1
+            fail = self.random.random() < self.error_rate
+
+        time.sleep(max(0.0, self.latency()))
+
+        if fail:
+            raise FakeLLMError("Simulated provider error")
+
+        return AIMessage(content=self.responder(prompt))
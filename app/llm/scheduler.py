@@ -0,0 +1,572 @@
+"""
+LLM Call Scheduler
+Single gateway for every LLM call: rate limiting, concurrency bounds,
+deadlines, retries, hedged requests and circuit breaking.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from app.llm.budget import remaining_budget
+
+
+class LLMError(Exception):
+    """Raised when an LLM call cannot produce a response."""
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when an LLM call misses its deadline."""
+
+
+class LLMCapacityError(LLMError):
+    """Raised when no rate-limit token or in-flight slot frees up before the deadline."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the provider while the circuit is open."""
+
+
+# Per-context counters for attributing LLM usage to a conversation
+_call_tracker: ContextVar[Optional[Dict]] = ContextVar('llm_call_tracker', default=None)
+
+
+@contextmanager
+def track_calls():
+    """
+    Count LLM calls and provider attempts made inside the block.
+
+    Yields:
+        Dictionary with 'calls' and 'attempts', updated as calls happen
+    """
+    tracker = {'calls': 0, 'attempts': 0}
+    token = _call_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _call_tracker.reset(token)
+
+
+def _track(key: str):
+    """Increment the current context's call tracker, if any."""
+    tracker = _call_tracker.get()
+    if tracker is not None:
+        tracker[key] += 1
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    each request consumes one token.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add tokens earned since the last update."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self, deadline: float) -> bool:
+        """
+        Wait for a token until the deadline.
+
+        Args:
+            deadline: time.monotonic() value to give up at
+
+        Returns:
+            True if a token was taken, False if the deadline passed
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+
+            if now + wait_time > deadline:
+                return False
+            time.sleep(wait_time)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    States:
+        - closed: calls flow normally
+        - open: calls fail fast until `reset_timeout` has passed
+        - half_open: a single probe call decides whether to close again
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before probing
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a call may go to the provider."""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+                self.probing = False
+
+            # Half-open: let exactly one probe through
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def release_probe(self):
+        """Give back a half-open probe that never reached the provider."""
+        with self.lock:
+            self.probing = False
+
+    def record_failure(self):
+        """Count a failure and open the circuit if needed."""
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+def gemini_client_factory(temperature: float, timeout: Optional[float] = None):
+    """
+    Create a Gemini chat client.
+
+    Requests time out on the client side too, so a call the scheduler gave
+    up on frees its in-flight slot instead of holding it until the
+    provider answers. Retries are left to the scheduler.
+
+    Args:
+        temperature: Sampling temperature
+        timeout: Request timeout in seconds (default: LLM_TIMEOUT)
+
+    Returns:
+        ChatGoogleGenerativeAI instance
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model="gemini-flash-latest",
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=temperature,
+        timeout=timeout if timeout is not None else float(os.getenv("LLM_TIMEOUT", "20")),
+        max_retries=0
+    )
+
+
+class LLMScheduler:
+    """
+    Central scheduler that every LLM call goes through.
+
+    Each call:
+        1. Fails fast if the circuit breaker is open
+        2. Waits for a rate-limit token and an in-flight slot
+        3. Runs against a deadline, hedging with a duplicate request if the
+           first one is slower than the recent p95 latency
+        4. Retries failures with jittered exponential backoff
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable = gemini_client_factory,
+        rate_per_minute: float = 15,
+        burst: Optional[int] = None,
+        max_in_flight: int = 4,
+        timeout: float = 20.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 4.0,
+        hedge_after: Optional[float] = 3.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        """
+        Initialize scheduler.
+
+        Args:
+            client_factory: Callable taking a temperature and returning an
+                object with an invoke(prompt) method
+            rate_per_minute: Sustained request rate allowed
+            burst: Bucket capacity (defaults to rate_per_minute)
+            max_in_flight: Maximum concurrent provider requests, hedges included
+            timeout: Default per-call deadline in seconds
+            max_retries: Retries after the first failed attempt
+            backoff_base: First backoff delay in seconds
+            backoff_max: Maximum backoff delay in seconds
+            hedge_after: Hedge delay used until enough latencies are observed
+                (None disables hedging)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before probing
+        """
+        self.client_factory = client_factory
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst or rate_per_minute)
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.clients: Dict[float, object] = {}
+        self.latencies = deque(maxlen=200)
+        self.abandoned = set()  # requests still running after their call timed out
+        self.lock = threading.Lock()
+        self.metrics = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'attempts': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'capacity_rejections': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+            'circuit_rejections': 0
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        """Increment a metric counter."""
+        with self.lock:
+            self.metrics[key] += amount
+
+    def _client(self, temperature: float):
+        """Get the cached client for a temperature (one per process, not per call)."""
+        with self.lock:
+            if temperature not in self.clients:
+                self.clients[temperature] = self.client_factory(temperature)
+            return self.clients[temperature]
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Delay before sending a hedge: recent p95 latency once known."""
+        if self.hedge_after is None:
+            return None
+
+        with self.lock:
+            samples = sorted(self.latencies)
+
+        if len(samples) < 20:
+            return self.hedge_after
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def _submit(self, client, prompt: str):
+        """Start one provider request in an already-acquired in-flight slot."""
+        self._count('attempts')
+        _track('attempts')
+        future = self.executor.submit(client.invoke, prompt)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        """Free a finished request's in-flight slot."""
+        with self.lock:
+            self.abandoned.discard(future)
+        self.slots.release()
+
+    def _abandon(self, futures):
+        """Remember requests still holding slots after their call timed out."""
+        with self.lock:
+            for future in futures:
+                if not future.done():
+                    self.abandoned.add(future)
+
+    def _acquire_slot(self, deadline: float) -> bool:
+        """Wait for a rate-limit token and an in-flight slot."""
+        if not self.bucket.acquire(deadline):
+            return False
+        return self.slots.acquire(timeout=max(0.0, deadline - time.monotonic()))
+
+    def _attempt(self, client, prompt: str, deadline: float):
+        """
+        Run one (possibly hedged) attempt before the deadline.
+
+        Returns:
+            Provider response
+
+        Raises:
+            LLMCapacityError: If no request could be started before the deadline
+            LLMTimeoutError: If no request finished before the deadline, or
+                every slot is held by requests that already timed out
+            Exception: The provider error if every request failed
+        """
+        # Every slot held by a request that already timed out: the provider
+        # is hung, so fail fast and let the breaker see it
+        with self.lock:
+            hung = len(self.abandoned) >= self.max_in_flight
+        if hung:
+            raise LLMTimeoutError("All LLM slots held by timed-out requests")
+
+        if not self._acquire_slot(deadline):
+            raise LLMCapacityError("No LLM capacity before deadline")
+
+        started = time.monotonic()
+        primary = self._submit(client, prompt)
+        pending = {primary}
+        error = None
+
+        hedge_delay = self._hedge_delay()
+        first_wait = deadline - started
+        if hedge_delay is not None:
+            first_wait = min(first_wait, hedge_delay)
+
+        done, pending = wait(pending, timeout=max(0.0, first_wait), return_when=FIRST_COMPLETED)
+
+        # Primary is a tail-latency outlier: race a duplicate if capacity allows
+        if not done and hedge_delay is not None and time.monotonic() < deadline:
+            if self.slots.acquire(blocking=False):
+                if self.bucket.try_acquire():
+                    self._count('hedges')
+                    pending.add(self._submit(client, prompt))
+                else:
+                    self.slots.release()
+
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    with self.lock:
+                        self.latencies.append(time.monotonic() - started)
+                    if future is not primary:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+
+            if not pending:
+                raise error
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._abandon(pending)
+                raise LLMTimeoutError("LLM call exceeded its deadline")
+
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+    def invoke(self, prompt: str, temperature: float = 0, timeout: Optional[float] = None):
+        """
+        Invoke the LLM through the scheduler.
+
+        Args:
+            prompt: Prompt text
+            temperature: Sampling temperature
+            timeout: Deadline in seconds for the whole call, retries included
+                (defaults to the scheduler timeout, capped by any turn budget)
+
+        Returns:
+            Provider response (has a .content attribute)
+
+        Raises:
+            CircuitOpenError: If the provider is considered degraded
+            LLMCapacityError: If local rate/concurrency limits left no capacity
+            LLMTimeoutError: If the deadline passed
+            LLMError: If all retries failed
+        """
+        self._count('calls')
+        _track('calls')
+        call_timeout = timeout if timeout is not None else self.timeout
+
+        # Never outlive the current turn's latency budget
+        budget = remaining_budget()
+        if budget is not None:
+            if budget <= 0:
+                self._count('timeouts')
+                self._count('failures')
+                raise LLMTimeoutError("Turn latency budget exhausted")
+            call_timeout = min(call_timeout, budget)
+
+        deadline = time.monotonic() + call_timeout
+        client = self._client(temperature)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._count('circuit_rejections')
+                raise CircuitOpenError("LLM circuit is open")
+
+            if attempt > 0:
+                self._count('retries')
+
+            try:
+                response = self._attempt(client, prompt, deadline)
+                self.breaker.record_success()
+                self._count('successes')
+                return response
+            except LLMCapacityError:
+                # Local back-pressure says nothing about provider health
+                self.breaker.release_probe()
+                self._count('capacity_rejections')
+                self._count('failures')
+                raise
+            except LLMTimeoutError:
+                self.breaker.record_failure()
+                self._count('timeouts')
+                self._count('failures')
+                raise
+            except Exception as e:
+                self.breaker.record_failure()
+                last_error = e
+
+            # Equal jitter: between half and all of the exponential delay
+            backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            backoff *= random.uniform(0.5, 1.0)
+            if attempt == self.max_retries or time.monotonic() + backoff >= deadline:
+                break
+            time.sleep(backoff)
+
+        self._count('failures')
+        raise LLMError(f"LLM call failed: {last_error}") from last_error
+
+    def get_metrics(self) -> Dict:
+        """
+        Get scheduler counters and breaker state.
+
+        Returns:
+            Dictionary of metrics
+        """
+        with self.lock:
+            metrics = dict(self.metrics)
+        metrics['circuit_state'] = self.breaker.state
+        return metrics
+
+
+# Global scheduler instance (initialized once)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def create_scheduler_from_env(client_factory: Callable = gemini_client_factory) -> LLMScheduler:
+    """
+    Create a scheduler configured from LLM_* environment variables.
+
+    Args:
+        client_factory: Client factory to use
+
+    Returns:
+        New LLMScheduler
+    """
+    hedge_after = os.getenv("LLM_HEDGE_AFTER", "3.0")
+
+    return LLMScheduler(
+        client_factory=client_factory,
+        rate_per_minute=float(os.getenv("LLM_RATE_PER_MINUTE", "15")),
+        max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+        timeout=float(os.getenv("LLM_TIMEOUT", "20")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        hedge_after=float(hedge_after) if hedge_after.lower() != "off" else None,
+        failure_threshold=int(os.getenv("LLM_FAILURE_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("LLM_RESET_TIMEOUT", "30"))
+    )
+
+
+def get_scheduler() -> LLMScheduler:
+    """Get or create global scheduler instance."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = create_scheduler_from_env()
+        return _scheduler
+
+
+def set_scheduler(scheduler: Optional[LLMScheduler]):
+    """
+    Replace the global scheduler (e.g. with one backed by a fake LLM).
+
+    Args:
+        scheduler: Scheduler to install, or None to recreate from env on next use
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def invoke_llm(prompt: str, temperature: float = 0, timeout: Optional[float] = None):
+    """
+    Invoke the LLM through the global scheduler.
+
+    Args:
+        prompt: Prompt text
+        temperature: Sampling temperature
+        timeout: Optional per-call deadline in seconds
+
+    Returns:
+        Provider response (has a .content attribute)
+    """
+    return get_scheduler().invoke(prompt, temperature=temperature, timeout=timeout)
+
+
+if __name__ == "__main__":
+    # Exercise the scheduler against a local fake LLM
+    from app.llm.fake import FakeLLM
+
+    fake = FakeLLM(latency=lambda: random.choice([0.05, 0.05, 0.05, 1.0]), error_rate=0.2)
+    scheduler = LLMScheduler(
+        client_factory=lambda temperature: fake,
+        rate_per_minute=600,
+        hedge_after=0.2,
+        backoff_base=0.05
+    )
+
+    for i in range(10):
+        try:
+            print(f"{i}: {scheduler.invoke('hello', timeout=2.0).content}")
+        except LLMError as e:
+            print(f"{i}: {type(e).__name__}: {e}")
+
+    print(scheduler.get_metrics())
@@ -0,0 +1,326 @@
+"""
+Load Generator
+Drives synthetic concurrent conversations through the compiled graph
+against a fake LLM and reports throughput, latency and resource usage.
+
+Usage:
+    python app/loadtest.py --conversations 500 --concurrency 50 \\
+        --latency lognormal:0.6,0.5 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import HumanMessage
+from app.graph import create_graph
+from app.state import AgentState
+from app.llm.budget import turn_budget
+from app.llm.fake import FakeLLM, parse_latency, scripted_responder
+from app.llm.scheduler import LLMScheduler, set_scheduler, track_calls
+from app.rag.context import get_context_stats
+from app.rag.retriever import get_retriever
+from app.transcripts import load_demo_script
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Templates for synthetic conversations
+GREETINGS = ["hey there", "hi", "hello!", "good morning", "hi, how are you?"]
+PRICING_QUESTIONS = [
+    "what are your pricing plans?",
+    "is there anything cheaper than $29?",
+    "how much is the pro plan?",
+    "what do I get with the basic plan?",
+    "does the pro plan support 4K?"
+]
+HIGH_INTENT = [
+    "okay, i want to try the basic plan",
+    "i'd like to sign up for pro",
+    "let's get started",
+    "sounds good, i'm interested"
+]
+INTERJECTIONS = [
+    "wait, what's your refund policy?",
+    "one more thing – what about support?",
+    "can you tell me about 24/7 support?",
+    "how does the refund work?"
+]
+NAMES = ["yogesh", "Priya Sharma", "John Doe", "Ana", "Wei Chen", "okay, i’m Sam"]
+PLATFORMS = ["YouTube", "Instagram", "TikTok", "i mostly post on insta", "LinkedIn"]
+
+
+def generate_conversation(rng: random.Random, interjection_rate: float = 0.3) -> List[str]:
+    """
+    Create one synthetic conversation from the templates.
+
+    Shape: greeting, 1-2 pricing questions, high intent, then name, email
+    and platform, with optional questions interjected during lead collection.
+
+    Args:
+        rng: Random source
+        interjection_rate: Probability of a question before each lead field
+
+    Returns:
+        List of user messages
+    """
+    name = rng.choice(NAMES)
+    first_name = name.replace("okay, i’m ", "").split()[0].lower()
+
+    turns = [rng.choice(GREETINGS)]
+    turns += rng.sample(PRICING_QUESTIONS, rng.randint(1, 2))
+    turns.append(rng.choice(HIGH_INTENT))
+
+    for field in [name, f"{first_name}@example.com", rng.choice(PLATFORMS)]:
+        if rng.random() < interjection_rate:
+            turns.append(rng.choice(INTERJECTIONS))
+        turns.append(field)
+
+    return turns
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0 if unavailable)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+def run_conversation(graph, turns: List[str], turn_budget_seconds: float) -> Dict:
+    """
+    Run one conversation through the graph.
+
+    Args:
+        graph: Compiled graph
+        turns: User messages
+        turn_budget_seconds: Per-turn latency budget
+
+    Returns:
+        Dictionary with turn latencies, LLM call counts and outcome
+    """
+    state: AgentState = {
+        'messages': [],
+        'intent': '',
+        'lead_info': {},
+        'tool_called': False,
+        'collecting_lead': False,
+        'degraded': False,
+        'tenant': ''
+    }
+    latencies = []
+    degraded_turns = 0
+    errors = 0
+
+    with track_calls() as calls:
+        for message in turns:
+            state['messages'].append(HumanMessage(content=message))
+            started = time.perf_counter()
+            try:
+                with turn_budget(turn_budget_seconds):
+                    state = graph.invoke(state)
+                degraded_turns += int(bool(state.get('degraded')))
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    return {
+        'latencies': latencies,
+        'llm_calls': calls['calls'],
+        'llm_attempts': calls['attempts'],
+        'degraded_turns': degraded_turns,
+        'errors': errors,
+        'lead_captured': bool(state.get('tool_called'))
+    }
+
+
+def run_load(
+    conversations: int,
+    concurrency: int,
+    latency: str,
+    error_rate: float,
+    turn_budget_seconds: float,
+    demo_ratio: float = 0.2,
+    seed: int = 0,
+    scheduler_options: Dict = None,
+    trace_memory: bool = False
+) -> Dict:
+    """
+    Drive synthetic conversations concurrently and build a report.
+
+    Args:
+        conversations: Number of conversations to run
+        concurrency: Conversations in flight at once
+        latency: Fake LLM latency spec (see parse_latency)
+        error_rate: Fake LLM error probability
+        turn_budget_seconds: Per-turn latency budget
+        demo_ratio: Share of conversations replaying the demo script verbatim
+        seed: Random seed
+        scheduler_options: Extra LLMScheduler keyword arguments
+        trace_memory: Also trace Python allocations (slows every allocation,
+            so latency and throughput figures are distorted)
+
+    Returns:
+        Report dictionary
+    """
+    rng = random.Random(seed)
+    demo_script = load_demo_script()
+    scripts = [
+        demo_script if rng.random() < demo_ratio else generate_conversation(rng)
+        for _ in range(conversations)
+    ]
+
+    fake = FakeLLM(
+        latency=parse_latency(latency, seed),
+        error_rate=error_rate,
+        responder=scripted_responder,
+        seed=seed
+    )
+    options = {'rate_per_minute': 1_000_000, 'max_in_flight': concurrency * 2}
+    options.update(scheduler_options or {})
+    scheduler = LLMScheduler(client_factory=lambda temperature: fake, **options)
+    set_scheduler(scheduler)
+
+    # Load the embedding model before timing anything
+    get_retriever()
+    graph = create_graph()
+    baseline_rss = peak_rss_mb()
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda turns: run_conversation(graph, turns, turn_budget_seconds), scripts
+        ))
+    elapsed = time.perf_counter() - started
+    traced_peak = None
+    if trace_memory:
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies = [t for r in results for t in r['latencies']]
+    calls = [r['llm_calls'] for r in results]
+    total_turns = len(latencies)
+
+    return {
+        'conversations': conversations,
+        'concurrency': concurrency,
+        'fake_llm': {'latency': latency, 'error_rate': error_rate},
+        'elapsed_s': round(elapsed, 3),
+        'throughput': {
+            'turns_per_s': round(total_turns / elapsed, 2),
+            'conversations_per_s': round(conversations / elapsed, 2)
+        },
+        'turn_latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies, default=0) * 1000, 1)
+        },
+        'llm_calls_per_conversation': {
+            'mean': round(sum(calls) / len(calls), 2) if calls else 0,
+            'p95': percentile(calls, 95),
+            'attempts_mean': round(sum(r['llm_attempts'] for r in results) / len(results), 2) if results else 0
+        },
+        'turns': total_turns,
+        'degraded_turns': sum(r['degraded_turns'] for r in results),
+        'failed_turns': sum(r['errors'] for r in results),
+        'leads_captured': sum(r['lead_captured'] for r in results),
+        'memory_mb': {
+            'peak_rss': round(peak_rss_mb(), 1),
+            'peak_rss_before_load': round(baseline_rss, 1),
+            'peak_traced_python': round(traced_peak / 1024 / 1024, 1) if traced_peak is not None else None
+        },
+        'scheduler': scheduler.get_metrics(),
+        'context': get_context_stats()
+    }
+
+
+def print_report(report: Dict):
+    """Print a formatted load test report."""
+    latency = report['turn_latency_ms']
+    calls = report['llm_calls_per_conversation']
+    memory = report['memory_mb']
+
+    print("\n" + "="*50)
+    print("LOAD TEST REPORT")
+    print("="*50)
+    print(f"Conversations:           {report['conversations']} (concurrency {report['concurrency']})")
+    print(f"Fake LLM:                {report['fake_llm']['latency']}, {report['fake_llm']['error_rate']:.0%} errors")
+    print(f"Elapsed:                 {report['elapsed_s']}s")
+    print(f"Throughput:              {report['throughput']['turns_per_s']} turns/s, "
+          f"{report['throughput']['conversations_per_s']} conversations/s")
+    print(f"Turn latency (ms):       p50 {latency['p50']}  p95 {latency['p95']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+    print(f"LLM calls/conversation:  mean {calls['mean']}  p95 {calls['p95']}  "
+          f"(attempts mean {calls['attempts_mean']})")
+    print(f"Degraded turns:          {report['degraded_turns']}/{report['turns']}")
+    print(f"Failed turns:            {report['failed_turns']}")
+    print(f"Leads captured:          {report['leads_captured']}")
+    print(f"Peak RSS:                {memory['peak_rss']} MB (before load {memory['peak_rss_before_load']} MB)")
+    if memory['peak_traced_python'] is not None:
+        print(f"Peak traced Python heap: {memory['peak_traced_python']} MB (tracing on - timings inflated)")
+    print("="*50 + "\n")
+
+
+def main():
+    """Parse arguments and run the load test."""
+    parser = argparse.ArgumentParser(description="AutoStream agent load generator")
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", default="lognormal:0.5,0.5",
+                        help="Fake LLM latency: SECONDS, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA or exp:MEAN")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--turn-budget", type=float, default=8.0, help="Per-turn latency budget in seconds")
+    parser.add_argument("--demo-ratio", type=float, default=0.2,
+                        help="Share of conversations replaying demo/demo_questions.txt")
+    parser.add_argument("--rate-per-minute", type=float, default=1_000_000, help="Scheduler rate limit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the peak traced Python heap (slows the run; timings are distorted)")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = run_load(
+        conversations=args.conversations,
+        concurrency=args.concurrency,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        turn_budget_seconds=args.turn_budget,
+        demo_ratio=args.demo_ratio,
+        seed=args.seed,
+        scheduler_options={'rate_per_minute': args.rate_per_minute},
+        trace_memory=args.trace_memory
+    )
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
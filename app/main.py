@@ -2,6 +2,7 @@
 AutoStream Conversational Agent
 Main application for terminal-based chat interface.
 """
+import logging
 import os
 import sys
 from pathlib import Path
@@ -15,6 +16,8 @@ from langchain_core.messages import HumanMessage
 from app.graph import create_graph
 from app.state import AgentState
 from app.analytics import ConversationAnalytics
+from app.llm.budget import turn_budget
+from app.rag.warmup import load_warm_snapshot
 
 
 def main():
@@ -22,6 +25,12 @@ def main():
     # Load environment variables (override=True forces reload from .env)
     load_dotenv(override=True)
     
+    # Hard upper bound on LLM time per turn before falling back to local rules
+    turn_budget_seconds = float(os.getenv("TURN_BUDGET_SECONDS", "8"))
+    
+    # LOG_LEVEL=INFO shows retrieval and prompt-size instrumentation
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+    
     # Check for API key
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
@@ -37,7 +46,25 @@ def main():
     print("Initializing AutoStream Agent...")
     print("(This may take a moment to load the embedding model)\n")
     
-    graph = create_graph()
+    # AUTOSTREAM_PROFILE=report.json profiles memory per node, turn and session
+    profile_path = os.getenv("AUTOSTREAM_PROFILE")
+    profiler = None
+    if profile_path:
+        from app.profiling import MemoryProfiler
+        from app.rag.retriever import get_embedding_model, get_retriever
+        profiler = MemoryProfiler()
+        
+        # Load the model and index up front so they don't count as session growth
+        profiler.measure_model_load(get_embedding_model)
+        get_retriever(os.getenv("AUTOSTREAM_TENANT", ""))
+    
+    graph = create_graph(profiler=profiler)
+    
+    # Start with warm caches if a snapshot for the current knowledge base exists
+    load_warm_snapshot()
+    
+    if profiler:
+        profiler.start_session()
     
     # Initialize analytics tracker
     analytics = ConversationAnalytics()
@@ -48,7 +75,9 @@ def main():
         'intent': '',
         'lead_info': {},
         'tool_called': False,
-        'collecting_lead': False
+        'collecting_lead': False,
+        'degraded': False,
+        'tenant': os.getenv("AUTOSTREAM_TENANT", "")
     }
     
     print("="*60)
@@ -76,7 +105,8 @@ def main():
         
         # Run graph
         try:
-            state = graph.invoke(state)
+            with turn_budget(turn_budget_seconds):
+                state = graph.invoke(state)
             
             # Get last AI message
             last_ai_message = None
@@ -88,6 +118,12 @@ def main():
             if last_ai_message:
                 print(f"\nAgent: {last_ai_message}\n")
             
+            if state.get('degraded'):
+                print("(Note: answered in limited mode - our AI service is slow right now)\n")
+            
+            if profiler is not None:
+                profiler.record_turn(state)
+            
             turn_count += 1
             
         except Exception as e:
@@ -100,6 +136,11 @@ def main():
     # Log session for analytics
     analytics.log_session(state, turn_count)
     
+    if profiler is not None:
+        profiler.end_session(state)
+        profiler.write_report(profile_path, analytics)
+        print(f"Memory profile written to {profile_path}")
+    
     print("\n" + "="*60)
     print("Conversation Summary:")
     print(f"Total turns: {turn_count}")
@@ -3,9 +3,9 @@ Intent Classification Node
 Classifies user intent into: greeting, inquiry, or high_intent
 """
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 from app.state import AgentState
-import os
+from app.llm.scheduler import invoke_llm, LLMError
+from app.fallbacks import is_question, classify_intent_by_keywords
 
 
 def intent_node(state: AgentState) -> AgentState:
@@ -20,6 +20,9 @@ def intent_node(state: AgentState) -> AgentState:
     IMPORTANT: If lead collection is in progress, skip classification
     and maintain high_intent to continue the flow.
     
+    Falls back to keyword rules (marking the turn degraded) if the LLM
+    misses its deadline or is unavailable.
+    
     Args:
         state: Current agent state
         
@@ -27,19 +30,16 @@ def intent_node(state: AgentState) -> AgentState:
         Updated state with intent field
     """
     # Get last user message first
-    last_message = state['messages'][-1].content.lower()
+    last_message = state['messages'][-1].content
+    
+    # New turn: no fallback used yet
+    state['degraded'] = False
     
     # Check if we're in the middle of lead collection
     if state.get('collecting_lead', False):
         # Allow user to ask questions during lead collection
         # Detect if this is a question rather than providing info
-        question_indicators = [
-            '?', 'what', 'how', 'why', 'when', 'where', 
-            'tell me', 'explain', 'about', 'can you', 'could you'
-        ]
-        is_question = any(indicator in last_message for indicator in question_indicators)
-        
-        if is_question:
+        if is_question(last_message):
             # User is asking a question - temporarily answer it
             state['intent'] = 'inquiry'
             return state
@@ -48,16 +48,6 @@ def intent_node(state: AgentState) -> AgentState:
             state['intent'] = 'high_intent'
             return state
     
-    # Get last user message
-    last_message = state['messages'][-1].content
-    
-    # Initialize LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-flash-latest",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0
-    )
-    
     # Intent classification prompt
     prompt = f"""Classify the user's intent into exactly one category:
 
@@ -70,8 +60,13 @@ User message: "{last_message}"
 
 Respond with ONLY the category name (greeting, inquiry, or high_intent)."""
     
-    response = llm.invoke(prompt)
-    intent = response.content.strip().lower()
+    try:
+        response = invoke_llm(prompt, temperature=0)
+        intent = response.content.strip().lower()
+    except LLMError:
+        # LLM slow or down - fall back to keyword rules
+        intent = classify_intent_by_keywords(last_message)
+        state['degraded'] = True
     
     # Validate intent
     if intent not in ['greeting', 'inquiry', 'high_intent']:
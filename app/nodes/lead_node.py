@@ -3,10 +3,29 @@ Lead Qualification Node
 Collects lead information (name, email, platform) when high intent is detected.
 """
 from langchain_core.messages import AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 from app.state import AgentState
-import os
-import re
+from app.llm.scheduler import invoke_llm, LLMError
+from app.fallbacks import extract_name, extract_email, extract_platform
+
+
+def _extract(state: AgentState, extraction_prompt: str, fallback, last_message: str) -> str:
+    """
+    Run an LLM extraction, falling back to local rules if the LLM fails.
+    
+    Args:
+        state: Current agent state (marked degraded on fallback)
+        extraction_prompt: Prompt asking for one field or "NOT_FOUND"
+        fallback: Local extractor returning the field or None
+        last_message: User message to extract from
+        
+    Returns:
+        Extracted value or "NOT_FOUND"
+    """
+    try:
+        return invoke_llm(extraction_prompt, temperature=0).content.strip()
+    except LLMError:
+        state['degraded'] = True
+        return fallback(last_message) or "NOT_FOUND"
 
 
 def lead_node(state: AgentState) -> AgentState:
@@ -15,7 +34,8 @@ def lead_node(state: AgentState) -> AgentState:
     
     Process:
         1. Check which fields are missing (name, email, platform)
-        2. Try to extract info from last message
+        2. Try to extract info from last message (regex and gazetteer
+           rules stand in if the LLM is unavailable)
         3. Ask for next missing field
     
     Args:
@@ -30,13 +50,6 @@ def lead_node(state: AgentState) -> AgentState:
     
     last_message = state['messages'][-1].content
     
-    # Initialize LLM for extraction
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-flash-latest",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0
-    )
-    
     # Check what information we currently have
     has_name = bool(lead_info.get('name'))
     has_email = bool(lead_info.get('email'))
@@ -56,8 +69,7 @@ def lead_node(state: AgentState) -> AgentState:
 
 If a name is present, respond with ONLY the name. If no name is found, respond with "NOT_FOUND"."""
         
-        result = llm.invoke(extraction_prompt)
-        extracted_name = result.content.strip()
+        extracted_name = _extract(state, extraction_prompt, extract_name, last_message)
         
         if extracted_name != "NOT_FOUND" and len(extracted_name) > 0:
             lead_info['name'] = extracted_name
@@ -66,11 +78,10 @@ If a name is present, respond with ONLY the name. If no name is found, respond w
     # Extract email if we have name but not email
     if has_name and not has_email:
         # Try regex first
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, last_message)
+        email = extract_email(last_message)
         
-        if emails:
-            lead_info['email'] = emails[0]
+        if email:
+            lead_info['email'] = email
             has_email = True
         else:
             # Try LLM extraction
@@ -78,8 +89,7 @@ If a name is present, respond with ONLY the name. If no name is found, respond w
 
 If an email is present, respond with ONLY the email. If no email is found, respond with "NOT_FOUND"."""
             
-            result = llm.invoke(extraction_prompt)
-            extracted_email = result.content.strip()
+            extracted_email = _extract(state, extraction_prompt, extract_email, last_message)
             
             if extracted_email != "NOT_FOUND" and '@' in extracted_email:
                 lead_info['email'] = extracted_email
@@ -93,8 +103,7 @@ Common platforms: Instagram, Facebook, YouTube, TikTok, Twitter, LinkedIn
 
 If a platform is mentioned, respond with ONLY the platform name. If no platform is found, respond with "NOT_FOUND"."""
         
-        result = llm.invoke(extraction_prompt)
-        extracted_platform = result.content.strip()
+        extracted_platform = _extract(state, extraction_prompt, extract_platform, last_message)
         
         if extracted_platform != "NOT_FOUND" and len(extracted_platform) > 0:
             lead_info['platform'] = extracted_platform
@@ -3,44 +3,95 @@ RAG Node
 Answers product questions using retrieved context from knowledge base.
 """
 from langchain_core.messages import AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 from app.state import AgentState
-from app.rag.retriever import get_retriever
+from app.llm.scheduler import invoke_llm, LLMError
+from app.rag.retriever import get_retriever, LocalRetriever, Filters
+from app.rag.warmup import get_warm_cache
+from app.rag.context import (
+    pack_context,
+    direct_answer,
+    estimate_tokens,
+    record_prompt_size
+)
+import logging
 import os
+import re
+from typing import Dict, List, Optional, Tuple
 
 
-def rag_node(state: AgentState) -> AgentState:
+logger = logging.getLogger(__name__)
+
+# Documents the node sent before context packing (the prompt-size baseline)
+BASELINE_TOP_K = 2
+
+# Reply when retrieval finds nothing to answer from
+NO_CONTEXT_ANSWER = "I couldn't find that in our knowledge base."
+
+# Words signalling a question about plans (pricing, limits, features)
+PLAN_KEYWORDS = [
+    'plan', 'price', 'pricing', 'cost', 'cheap', 'expensive', 'how much',
+    'per month', '$', 'videos', 'resolution', '720p', '4k', 'caption', 'subscription'
+]
+
+# Synonyms mapping question words to policy names in the knowledge base
+POLICY_KEYWORDS = {
+    'refund': 'refund',
+    'money back': 'refund',
+    'cancel': 'refund',
+    'support': 'support',
+    'help desk': 'support',
+    'customer service': 'support'
+}
+
+
+def infer_filters(user_question: str, intent: str, retriever: LocalRetriever) -> Optional[Filters]:
     """
-    Answer user question using RAG.
+    Narrow retrieval to plans or policies when the question is clearly about one.
     
-    Process:
-        1. Retrieve relevant documents from knowledge base
-        2. Pass context + question to LLM
-        3. Generate answer strictly from context
+    Questions mixing both (e.g. "does Pro include 24/7 support?") are left
+    unfiltered so cross-cutting documents can still be found.
     
     Args:
-        state: Current agent state
+        user_question: User's question
+        intent: Classified intent
+        retriever: Retriever whose metadata values (plan/policy names) to match
         
     Returns:
-        Updated state with RAG response
+        Metadata filters, or None to search everything
     """
-    # Get last user message
-    user_question = state['messages'][-1].content
+    if intent != 'inquiry':
+        return None
     
-    # Retrieve relevant context
-    retriever = get_retriever()
-    relevant_docs = retriever.retrieve(user_question, top_k=2)
-    context = "\n\n".join(relevant_docs)
+    question = user_question.lower()
+    known_policies = retriever.postings.get('policy_name', {})
+    known_plans = retriever.postings.get('plan_name', {})
     
-    # Initialize LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-flash-latest",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.3
-    )
+    policies = sorted({
+        name for keyword, name in POLICY_KEYWORDS.items()
+        if keyword in question and name in known_policies
+    } | {name for name in known_policies if name in question})
+    plans = sorted(name for name in known_plans if re.search(rf"\b{re.escape(name)}\b", question))
+    asks_about_plans = bool(plans) or any(keyword in question for keyword in PLAN_KEYWORDS)
+    
+    if policies and not asks_about_plans:
+        return {'type': 'policy', 'policy_name': policies}
+    if asks_about_plans and not policies:
+        return {'type': 'plan', 'plan_name': plans} if plans else {'type': 'plan'}
+    return None
+
+
+def build_rag_prompt(context: str, user_question: str) -> str:
+    """
+    Build the grounded answer prompt.
     
-    # RAG prompt
-    prompt = f"""You are a helpful assistant for AutoStream, an AI-powered video editing SaaS platform.
+    Args:
+        context: Knowledge base passages
+        user_question: User's question
+        
+    Returns:
+        Prompt text
+    """
+    return f"""You are a helpful assistant for AutoStream, an AI-powered video editing SaaS platform.
 
 Answer the user's question using ONLY the information provided in the context below. If the context doesn't contain enough information to answer the question, say so politely.
 
@@ -50,8 +101,120 @@ Context:
 User question: {user_question}
 
 Provide a clear, concise answer based on the context above."""
+
+
+def retrieve_candidates(user_question: str, intent: str, retriever: LocalRetriever) -> List[Dict]:
+    """
+    Retrieve scored candidates, filtered by metadata when the question allows.
+    
+    Args:
+        user_question: User's question
+        intent: Classified intent
+        retriever: Retriever to search
+        
+    Returns:
+        Scored documents (see LocalRetriever.retrieve_with_scores)
+    """
+    # Number of candidates to score before packing the context
+    candidate_count = int(os.getenv("RAG_CANDIDATES", "4"))
+    
+    filters = infer_filters(user_question, intent, retriever)
+    candidates = retriever.retrieve_with_scores(user_question, top_k=candidate_count, filters=filters)
+    if filters and not candidates:
+        candidates = retriever.retrieve_with_scores(user_question, top_k=candidate_count)
+    return candidates
+
+
+def generate_answer(
+    user_question: str,
+    intent: str,
+    retriever: LocalRetriever,
+    candidates: Optional[List[Dict]] = None
+) -> Tuple[str, bool]:
+    """
+    Produce a knowledge-base-grounded answer.
+    
+    Args:
+        user_question: User's question
+        intent: Classified intent
+        retriever: Retriever to search
+        candidates: Pre-computed retrieval results (retrieved if None)
+        
+    Returns:
+        (answer, degraded) - degraded is True if the LLM was unavailable
+        and the top passage was served verbatim
+    """
+    if candidates is None:
+        candidates = retrieve_candidates(user_question, intent, retriever)
+    packed = pack_context(candidates)
+    
+    # Baseline: the prompt the node sent before packing (top-2 documents)
+    baseline = sorted(candidates, key=lambda doc: doc['score'], reverse=True)[:BASELINE_TOP_K]
+    tokens_before = estimate_tokens(
+        build_rag_prompt("\n\n".join(doc['content'] for doc in baseline), user_question)
+    )
+    
+    # Short path: one document fully answers the question
+    answer = direct_answer(user_question, packed)
+    if answer is not None:
+        record_prompt_size(tokens_before, 0, direct=True)
+        logger.info("RAG direct answer (prompt tokens %d -> 0)", tokens_before)
+        return answer, False
+    
+    if not packed['documents']:
+        # Nothing retrieved (e.g. an empty tenant knowledge base)
+        record_prompt_size(tokens_before, 0)
+        return NO_CONTEXT_ANSWER, False
+    
+    prompt = build_rag_prompt(packed['context'], user_question)
+    tokens_after = estimate_tokens(prompt)
+    record_prompt_size(tokens_before, tokens_after)
+    logger.info(
+        "RAG prompt tokens %d -> %d (%d/%d documents)",
+        tokens_before, tokens_after, len(packed['documents']), len(candidates)
+    )
+    
+    try:
+        return invoke_llm(prompt, temperature=0.3).content, False
+    except LLMError:
+        # LLM slow or down - serve the best passage verbatim
+        return packed['documents'][0]['content'], True
+
+
+def rag_node(state: AgentState) -> AgentState:
+    """
+    Answer user question using RAG.
+    
+    Process:
+        1. Serve a pre-warmed answer if the question is in the warm cache
+        2. Retrieve scored candidate documents from knowledge base,
+           filtered to plans or policies when the question is clearly about one
+        3. Pack the relevant ones into a token-budgeted context
+        4. Serve a single high-confidence document directly, or
+        5. Pass context + question to LLM and answer strictly from context
+           (serving the top passage verbatim if the LLM is unavailable)
+    
+    Args:
+        state: Current agent state
+        
+    Returns:
+        Updated state with RAG response
+    """
+    # Get last user message
+    user_question = state['messages'][-1].content
+    tenant = state.get('tenant') or ''
+    
+    warm = get_warm_cache(tenant)
+    answer = warm.lookup_answer(user_question) if warm else None
     
-    response = llm.invoke(prompt)
+    if answer is None:
+        retriever = get_retriever(tenant)
+        candidates = warm.lookup_retrieval(user_question) if warm else None
+        answer, degraded = generate_answer(
+            user_question, state.get('intent', 'inquiry'), retriever, candidates
+        )
+        if degraded:
+            state['degraded'] = True
     
-    state['messages'].append(AIMessage(content=response.content))
+    state['messages'].append(AIMessage(content=answer))
     return state
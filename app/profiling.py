@@ -0,0 +1,475 @@
+"""
+Memory Profiling
+Tracemalloc snapshots around each node and session, allocation attribution
+by module, RSS growth tracking and a diffable JSON report.
+
+Usage:
+    python app/profiling.py --output memory_report.json --sessions 5
+
+or profile an interactive session:
+    AUTOSTREAM_PROFILE=memory_report.json python app/main.py
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# RSS growth per turn above which the report flags a suspected leak
+LEAK_THRESHOLD_BYTES_PER_TURN = 256 * 1024
+
+# Modules shown per node/session in the report
+TOP_MODULES = 15
+
+
+def current_rss() -> int:
+    """
+    Current resident set size of this process in bytes.
+
+    Reads /proc on Linux; elsewhere falls back to peak RSS (0 if unavailable).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Objects deep_sizeof counts nothing for (shared code, not per-session data)
+_NOT_FOLLOWED = (
+    type, types.ModuleType, types.FunctionType,
+    types.BuiltinFunctionType, types.MethodType
+)
+
+
+def deep_sizeof(obj, max_depth: int = 8) -> int:
+    """
+    Approximate memory of an object and everything it references.
+
+    Follows containers and instance attributes, counting shared objects once.
+    Modules, classes and functions are not followed.
+
+    Args:
+        obj: Object to measure
+        max_depth: Maximum reference depth to follow
+
+    Returns:
+        Size in bytes
+    """
+    seen = set()
+    stack = [(obj, 0)]
+    total = 0
+
+    while stack:
+        current, depth = stack.pop()
+        if id(current) in seen or isinstance(current, _NOT_FOLLOWED):
+            continue
+        seen.add(id(current))
+
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+
+        if depth >= max_depth:
+            continue
+
+        if isinstance(current, dict):
+            children = list(current.keys()) + list(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            children = list(current)
+        else:
+            children = list(getattr(current, '__dict__', {}).values())
+            for slot in getattr(type(current), '__slots__', ()):
+                if isinstance(slot, str) and hasattr(current, slot):
+                    children.append(getattr(current, slot))
+
+        stack.extend((child, depth + 1) for child in children)
+
+    return total
+
+
+@functools.lru_cache(maxsize=None)
+def module_for(filename: str) -> str:
+    """
+    Map a source file to the module or package it belongs to.
+
+    Project files map to dotted module names (app.nodes.rag_node); installed
+    packages to their top-level package (sentence_transformers); anything
+    else to "stdlib:<name>".
+    """
+    if filename.startswith("<"):
+        # Frozen and generated code, e.g. "<frozen importlib._bootstrap>"
+        return f"stdlib:{filename.strip('<>').split()[-1]}"
+
+    path = Path(filename)
+    try:
+        relative = path.resolve().relative_to(project_root.resolve())
+        return ".".join(relative.with_suffix("").parts)
+    except (ValueError, OSError):
+        pass
+
+    parts = path.parts
+    for marker in ['site-packages', 'dist-packages']:
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return Path(parts[index + 1]).stem
+    return f"stdlib:{path.stem}"
+
+
+def _by_module(stats) -> Dict[str, int]:
+    """Sum tracemalloc statistic size differences per module."""
+    modules: Dict[str, int] = {}
+    for stat in stats:
+        module = module_for(stat.traceback[0].filename)
+        modules[module] = modules.get(module, 0) + stat.size_diff
+    return modules
+
+
+def _top(modules: Dict[str, int], limit: int = TOP_MODULES) -> Dict[str, int]:
+    """Largest allocations first (by absolute size), limited and JSON-friendly."""
+    ordered = sorted(modules.items(), key=lambda item: (-abs(item[1]), item[0]))
+    return dict(ordered[:limit])
+
+
+def _growth_per_turn(values: List[int]) -> float:
+    """Least-squares slope of a series (bytes per turn)."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    denominator = sum((x - mean_x) ** 2 for x in range(n))
+    return numerator / denominator
+
+
+class MemoryProfiler:
+    """
+    Collects memory measurements for nodes, turns and sessions.
+
+    Node and session measurements diff tracemalloc snapshots, so they are
+    only meaningful when one conversation runs at a time.
+    """
+
+    def __init__(self, label: str = "", frames: int = 1):
+        """
+        Initialize profiler and start tracemalloc.
+
+        Args:
+            label: Free-form label stored in the report (e.g. a git revision)
+            frames: Traceback depth recorded per allocation
+        """
+        self.label = label
+        self.lock = threading.Lock()
+        self.nodes: Dict[str, Dict] = {}
+        self.sessions: List[Dict] = []
+        self.baseline: Dict = {}
+        self._session: Optional[Dict] = None
+        self._session_snapshot = None
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ]
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def _snapshot(self):
+        """Take a snapshot excluding the profiler's own allocations."""
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def measure_model_load(self, load: Callable):
+        """
+        Measure RSS and parameter memory of loading the embedding model.
+
+        Args:
+            load: Callable returning the loaded SentenceTransformer
+
+        Returns:
+            The loaded model
+        """
+        rss_before = current_rss()
+        started = time.perf_counter()
+        model = load()
+        self.baseline['embedding_model_load_s'] = round(time.perf_counter() - started, 3)
+        self.baseline['embedding_model_rss_bytes'] = current_rss() - rss_before
+
+        try:
+            self.baseline['embedding_model_param_bytes'] = sum(
+                p.numel() * p.element_size() for p in model.parameters()
+            )
+        except AttributeError:
+            pass
+        return model
+
+    def wrap_node(self, name: str, node: Callable) -> Callable:
+        """
+        Wrap a graph node to snapshot memory around each call.
+
+        Args:
+            name: Node name
+            node: Node function
+
+        Returns:
+            Wrapped node function
+        """
+        @functools.wraps(node)
+        def profiled(state):
+            before = self._snapshot()
+            tracemalloc.reset_peak()
+            start_current, _ = tracemalloc.get_traced_memory()
+
+            result = node(state)
+
+            current, peak = tracemalloc.get_traced_memory()
+            modules = _by_module(self._snapshot().compare_to(before, 'filename'))
+            self._record_node(name, current - start_current, peak - start_current, modules)
+            return result
+
+        return profiled
+
+    def _record_node(self, name: str, net: int, peak: int, modules: Dict[str, int]):
+        """Accumulate one node call."""
+        with self.lock:
+            stats = self.nodes.setdefault(name, {
+                'calls': 0,
+                'net_bytes_total': 0,
+                'peak_bytes_max': 0,
+                'modules': {}
+            })
+            stats['calls'] += 1
+            stats['net_bytes_total'] += net
+            stats['peak_bytes_max'] = max(stats['peak_bytes_max'], peak)
+            for module, size in modules.items():
+                stats['modules'][module] = stats['modules'].get(module, 0) + size
+
+    def start_session(self):
+        """Mark the start of a conversation."""
+        self._session_snapshot = self._snapshot()
+        self._session = {
+            'rss_start_bytes': current_rss(),
+            'traced_start_bytes': tracemalloc.get_traced_memory()[0],
+            'turns': []
+        }
+
+    def record_turn(self, state: Dict):
+        """
+        Record memory after a conversation turn.
+
+        Args:
+            state: Agent state after the turn
+        """
+        if self._session is None:
+            self.start_session()
+
+        self._session['turns'].append({
+            'rss_bytes': current_rss(),
+            'traced_bytes': tracemalloc.get_traced_memory()[0],
+            'messages': len(state.get('messages', [])),
+            'messages_bytes': deep_sizeof(state.get('messages', [])),
+            'lead_info_bytes': deep_sizeof(state.get('lead_info', {}))
+        })
+
+    def end_session(self, state: Dict):
+        """
+        Finish the current conversation and attribute its allocations.
+
+        Args:
+            state: Final agent state
+        """
+        if self._session is None:
+            return
+
+        session = self._session
+        modules = _by_module(self._snapshot().compare_to(self._session_snapshot, 'filename'))
+        rss = [turn['rss_bytes'] for turn in session['turns']]
+        traced = [turn['traced_bytes'] for turn in session['turns']]
+
+        session.update({
+            'rss_end_bytes': current_rss(),
+            'traced_end_bytes': tracemalloc.get_traced_memory()[0],
+            'state_bytes': deep_sizeof(state),
+            'rss_growth_per_turn_bytes': round(_growth_per_turn(rss)),
+            'traced_growth_per_turn_bytes': round(_growth_per_turn(traced)),
+            'top_modules': _top(modules)
+        })
+        session['rss_growth_bytes'] = session['rss_end_bytes'] - session['rss_start_bytes']
+        session['traced_growth_bytes'] = session['traced_end_bytes'] - session['traced_start_bytes']
+
+        self.sessions.append(session)
+        self._session = None
+        self._session_snapshot = None
+
+    def shared_footprint(self, analytics=None) -> Dict:
+        """
+        Measure process-wide structures shared across sessions.
+
+        Args:
+            analytics: Optional ConversationAnalytics instance
+
+        Returns:
+            Sizes of retriever indexes, LLM clients and analytics sessions
+        """
+        from app.rag import retriever as retriever_module
+        from app.llm import scheduler as scheduler_module
+
+        footprint = {}
+
+        index_bytes = 0
+        if retriever_module._retriever is not None:
+            index_bytes += retriever_module._retriever.memory_bytes()
+        if 'app.rag.tenants' in sys.modules:
+            registry = sys.modules['app.rag.tenants']._registry
+            if registry is not None:
+                index_bytes += registry.get_metrics()['memory_bytes']
+        footprint['retriever_index_bytes'] = index_bytes
+
+        llm_scheduler = scheduler_module._scheduler
+        if llm_scheduler is not None:
+            footprint['llm_clients'] = len(llm_scheduler.clients)
+            footprint['llm_client_bytes'] = deep_sizeof(list(llm_scheduler.clients.values()))
+
+        if analytics is not None:
+            footprint['analytics_sessions'] = len(analytics.sessions)
+            footprint['analytics_sessions_bytes'] = deep_sizeof(analytics.sessions)
+
+        return footprint
+
+    def report(self, analytics=None) -> Dict:
+        """
+        Build the profiling report.
+
+        Args:
+            analytics: Optional ConversationAnalytics instance to measure
+
+        Returns:
+            Report dictionary
+        """
+        nodes = {}
+        for name, stats in self.nodes.items():
+            nodes[name] = {
+                'calls': stats['calls'],
+                'net_bytes_total': stats['net_bytes_total'],
+                'net_bytes_per_call': round(stats['net_bytes_total'] / stats['calls']),
+                'peak_bytes_max': stats['peak_bytes_max'],
+                'top_modules': _top(stats['modules'])
+            }
+
+        # Leak check across every recorded turn of every session
+        rss = [turn['rss_bytes'] for s in self.sessions for turn in s['turns']]
+        traced = [turn['traced_bytes'] for s in self.sessions for turn in s['turns']]
+        rss_slope = _growth_per_turn(rss)
+
+        return {
+            'label': self.label,
+            'python': platform.python_version(),
+            'baseline': dict(self.baseline),
+            'nodes': nodes,
+            'sessions': self.sessions,
+            'shared': self.shared_footprint(analytics),
+            'leak_check': {
+                'turns': len(rss),
+                'rss_growth_per_turn_bytes': round(rss_slope),
+                'traced_growth_per_turn_bytes': round(_growth_per_turn(traced)),
+                'threshold_bytes_per_turn': LEAK_THRESHOLD_BYTES_PER_TURN,
+                'suspected': rss_slope > LEAK_THRESHOLD_BYTES_PER_TURN
+            }
+        }
+
+    def write_report(self, path: str, analytics=None):
+        """
+        Write the report as stable, sorted JSON so versions can be diffed.
+
+        Args:
+            path: Output JSON file
+            analytics: Optional ConversationAnalytics instance to measure
+        """
+        with open(path, 'w') as f:
+            json.dump(self.report(analytics), f, indent=2, sort_keys=True)
+
+
+def main():
+    """Replay the demo conversation under the profiler and write a report."""
+    parser = argparse.ArgumentParser(description="Profile AutoStream agent memory per node and session")
+    parser.add_argument("--output", default="memory_report.json")
+    parser.add_argument("--sessions", type=int, default=3, help="Times to replay the demo conversation")
+    parser.add_argument("--label", default="", help="Label stored in the report, e.g. a git revision")
+    parser.add_argument("--gemini", action="store_true", help="Use Gemini instead of the local fake LLM")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from langchain_core.messages import HumanMessage
+    from app.analytics import ConversationAnalytics
+    from app.graph import create_graph
+    from app.transcripts import load_demo_script
+    from app.rag.retriever import get_embedding_model, get_retriever
+
+    load_dotenv(override=True)
+    profiler = MemoryProfiler(label=args.label)
+    profiler.baseline['rss_before_model_bytes'] = current_rss()
+    profiler.measure_model_load(get_embedding_model)
+    get_retriever()
+    profiler.baseline['rss_after_index_bytes'] = current_rss()
+
+    if not args.gemini:
+        from app.llm.fake import FakeLLM, scripted_responder
+        from app.llm.scheduler import LLMScheduler, set_scheduler
+
+        fake = FakeLLM(responder=scripted_responder)
+        set_scheduler(LLMScheduler(client_factory=lambda temperature: fake, rate_per_minute=1_000_000))
+
+    graph = create_graph(profiler=profiler)
+    analytics = ConversationAnalytics(log_file=str(Path(args.output).with_suffix(".analytics.json")))
+    script = load_demo_script()
+
+    for _ in range(args.sessions):
+        state = {
+            'messages': [],
+            'intent': '',
+            'lead_info': {},
+            'tool_called': False,
+            'collecting_lead': False,
+            'degraded': False,
+            'tenant': ''
+        }
+        profiler.start_session()
+        for message in script:
+            state['messages'].append(HumanMessage(content=message))
+            state = graph.invoke(state)
+            profiler.record_turn(state)
+        profiler.end_session(state)
+        analytics.log_session(state, len(script), save=False)
+
+    profiler.write_report(args.output, analytics)
+    leak = profiler.report(analytics)['leak_check']
+    print(f"Wrote {args.output} - RSS growth {leak['rss_growth_per_turn_bytes']} bytes/turn"
+          f"{' (possible leak)' if leak['suspected'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Context Packing
+Selects which retrieved documents go into the RAG prompt, under a token budget.
+"""
+import math
+import os
+import re
+import threading
+from typing import List, Dict, Optional
+
+
+# Tunables: environment variable -> default (see setting())
+DEFAULTS = {
+    'RAG_MIN_SIMILARITY': 0.3,
+    'RAG_DEDUP_THRESHOLD': 0.8,
+    'RAG_CONTEXT_TOKENS': 300,
+    'RAG_DIRECT_ANSWER_SCORE': 0.75,
+    'RAG_DIRECT_ANSWER_COVERAGE': 0.8,
+    'RAG_DIRECT_ANSWER_MARGIN': 0.1
+}
+
+# Words that carry no information about what the user is asking for
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'be', 'can', 'do', 'does', 'for', 'from',
+    'how', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'tell',
+    'that', 'the', 'there', 'this', 'to', 'what', 'whats', 'when', 'where',
+    'which', 'who', 'why', 'with', 'you', 'your', 'about', 'any', 'anything'
+}
+
+_WORD_PATTERN = re.compile(r"[a-z0-9$]+")
+
+# Running totals for prompt-size instrumentation (full prompts, in tokens)
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'direct_answers': 0,
+    'tokens_before': 0,
+    'tokens_after': 0
+}
+
+
+def setting(name: str) -> float:
+    """
+    Read a tunable from the environment.
+
+    Read on each use rather than at import, so values from .env (loaded
+    in main()) take effect.
+
+    Args:
+        name: Environment variable from DEFAULTS
+
+    Returns:
+        Configured value, or its default
+    """
+    return float(os.getenv(name, DEFAULTS[name]))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheaply estimate the number of LLM tokens in a text.
+
+    Uses the common ~4 characters per token rule of thumb, which is close
+    enough for budgeting without loading a tokenizer.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _words(text: str) -> set:
+    """Lowercase word set of a text, ignoring punctuation."""
+    return set(_WORD_PATTERN.findall(text.lower().replace("'", "")))
+
+
+def _overlap(a: str, b: str) -> float:
+    """Jaccard overlap between the word sets of two texts."""
+    words_a, words_b = _words(a), _words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def question_coverage(question: str, document: str) -> float:
+    """
+    Fraction of the question's content words that appear in a document.
+
+    Args:
+        question: User question
+        document: Candidate document content
+
+    Returns:
+        Coverage between 0 and 1 (1 if the question has no content words)
+    """
+    terms = _words(question) - STOPWORDS
+    if not terms:
+        return 1.0
+    return len(terms & _words(document)) / len(terms)
+
+
+def pack_context(
+    results: List[Dict],
+    token_budget: Optional[int] = None,
+    min_score: Optional[float] = None,
+    dedup_threshold: Optional[float] = None
+) -> Dict:
+    """
+    Greedily pack scored retrieval results into a prompt context.
+
+    Process:
+        1. Drop results below the similarity cutoff (the best result is
+           always kept so the LLM has something to refuse from)
+        2. Drop near-duplicates of documents already selected
+        3. Add documents in score order while they fit the token budget
+
+    Args:
+        results: Output of LocalRetriever.retrieve_with_scores
+        token_budget: Maximum estimated tokens of context (default: RAG_CONTEXT_TOKENS)
+        min_score: Similarity cutoff (default: RAG_MIN_SIMILARITY)
+        dedup_threshold: Word overlap above which a document is a duplicate
+            (default: RAG_DEDUP_THRESHOLD)
+
+    Returns:
+        Dictionary with 'documents' (selected results) and 'context'
+        (joined text)
+    """
+    if token_budget is None:
+        token_budget = int(setting('RAG_CONTEXT_TOKENS'))
+    if min_score is None:
+        min_score = setting('RAG_MIN_SIMILARITY')
+    if dedup_threshold is None:
+        dedup_threshold = setting('RAG_DEDUP_THRESHOLD')
+
+    ranked = sorted(results, key=lambda doc: doc['score'], reverse=True)
+
+    selected = []
+    used_tokens = 0
+
+    for doc in ranked:
+        if selected and doc['score'] < min_score:
+            break
+
+        if any(_overlap(doc['content'], kept['content']) >= dedup_threshold for kept in selected):
+            continue
+
+        doc_tokens = estimate_tokens(doc['content'])
+        if selected and used_tokens + doc_tokens > token_budget:
+            continue
+
+        selected.append(doc)
+        used_tokens += doc_tokens
+
+    return {
+        'documents': selected,
+        'context': "\n\n".join(doc['content'] for doc in selected)
+    }
+
+
+def direct_answer(question: str, packed: Dict) -> Optional[str]:
+    """
+    Return a retrieval-only answer when one document clearly covers the question.
+
+    A document qualifies when its similarity is high, it contains most of
+    the question's content words and it is clearly ahead of the runner-up.
+
+    Args:
+        question: User question
+        packed: Output of pack_context
+
+    Returns:
+        The document content to serve verbatim, or None to use the LLM
+    """
+    documents = packed['documents']
+    if not documents:
+        return None
+
+    best = documents[0]
+    if best['score'] < setting('RAG_DIRECT_ANSWER_SCORE'):
+        return None
+
+    if len(documents) > 1 and best['score'] - documents[1]['score'] < setting('RAG_DIRECT_ANSWER_MARGIN'):
+        return None
+
+    if question_coverage(question, best['content']) < setting('RAG_DIRECT_ANSWER_COVERAGE'):
+        return None
+
+    return best['content']
+
+
+def record_prompt_size(tokens_before: int, tokens_after: int, direct: bool = False):
+    """
+    Accumulate prompt-size instrumentation.
+
+    Args:
+        tokens_before: Prompt the unpacked node would have sent (top-2 documents)
+        tokens_after: Prompt actually sent (0 if the LLM was not called)
+        direct: Whether the LLM call was skipped entirely
+    """
+    with _stats_lock:
+        _stats['requests'] += 1
+        _stats['tokens_before'] += tokens_before
+        _stats['tokens_after'] += tokens_after
+        if direct:
+            _stats['direct_answers'] += 1
+
+
+def get_context_stats() -> Dict:
+    """
+    Get aggregate prompt-size statistics.
+
+    Returns:
+        Dictionary with request count, direct answers, total prompt tokens
+        before and after packing, and the overall reduction
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    before = stats['tokens_before']
+    saved = (before - stats['tokens_after']) / before * 100 if before else 0
+    stats['reduction'] = f"{saved:.1f}%"
+    return stats
@@ -0,0 +1,404 @@
+"""
+Offline Index Builder
+Embeds a large corpus in parallel shards, checkpointing each finished shard
+so interrupted builds resume, then merges the shards into an index directory
+LocalRetriever can load (LocalRetriever(index_path=...)).
+
+Corpus formats:
+    - JSONL, one document per line: {"content": "...", "metadata": {...}}
+    - a knowledge_base.json (--kb), chunked like load_knowledge_base()
+
+Usage:
+    python app/rag/index_builder.py corpus.jsonl --output index/ --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.rag.loader import load_knowledge_base
+
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Index directory layout
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+MANIFEST_FILE = "manifest.json"
+
+# Embedding model of the current worker process
+_worker_model = None
+
+
+def iter_corpus(path: str, kb_format: bool = False) -> Iterator[Dict]:
+    """
+    Stream documents from a corpus without loading it all.
+
+    Args:
+        path: Corpus file
+        kb_format: Treat the file as a knowledge_base.json
+
+    Yields:
+        Documents with 'content' and 'metadata'
+    """
+    if kb_format:
+        yield from load_knowledge_base(path)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield {'content': record['content'], 'metadata': record.get('metadata', {})}
+
+
+def _init_worker(model_name: str, threads: int):
+    """Load the embedding model once per worker process."""
+    global _worker_model
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _shard_digest(documents: List[Dict]) -> str:
+    """Content hash of a shard's documents, as serialized to its docs file."""
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update((json.dumps(doc) + "\n").encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _encode_shard(shard_dir: str, shard_id: int, documents: List[Dict], batch_size: int, digest: str) -> int:
+    """
+    Embed one shard and write it to disk (runs in a worker process).
+
+    Documents, embeddings and finally the shard's metadata (document count
+    and content hash) are each written via rename; the metadata file marks
+    the shard complete.
+
+    Returns:
+        Number of documents embedded
+    """
+    base = Path(shard_dir) / f"shard-{shard_id:06d}"
+
+    docs_tmp = base.with_suffix(".docs.tmp")
+    with open(docs_tmp, 'w', encoding='utf-8') as f:
+        for doc in documents:
+            f.write(json.dumps(doc) + "\n")
+    os.replace(docs_tmp, base.with_suffix(".docs.jsonl"))
+
+    embeddings = _worker_model.encode(
+        [doc['content'] for doc in documents],
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    ).astype(np.float32)
+
+    emb_tmp = base.with_suffix(".tmp.npy")
+    np.save(emb_tmp, embeddings)
+    os.replace(emb_tmp, base.with_suffix(".npy"))
+
+    meta_tmp = base.with_suffix(".meta.tmp")
+    with open(meta_tmp, 'w') as f:
+        json.dump({'documents': len(documents), 'sha256': digest}, f)
+    os.replace(meta_tmp, base.with_suffix(".json"))
+    return len(documents)
+
+
+def _shard_done(shard_dir: Path, shard_id: int, documents: List[Dict], digest: str) -> bool:
+    """Whether a previous build completed this shard from the same documents."""
+    base = shard_dir / f"shard-{shard_id:06d}"
+    try:
+        with open(base.with_suffix(".json"), 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        meta == {'documents': len(documents), 'sha256': digest}
+        and base.with_suffix(".npy").exists()
+        and base.with_suffix(".docs.jsonl").exists()
+    )
+
+
+def _remove_shards_from(shard_dir: Path, first_stale: int) -> int:
+    """Delete shard files a shrunken corpus no longer produces."""
+    removed = set()
+    for path in shard_dir.glob("shard-*"):
+        shard_id = int(path.name[len("shard-"):len("shard-") + 6])
+        if shard_id >= first_stale:
+            path.unlink()
+            removed.add(shard_id)
+    return len(removed)
+
+
+def _check_build_config(shard_dir: Path, config: Dict):
+    """Refuse to resume shards built with different settings."""
+    config_path = shard_dir / "build.json"
+    if config_path.exists():
+        with open(config_path, 'r') as f:
+            previous = json.load(f)
+        if previous != config:
+            raise ValueError(
+                f"Existing shards in {shard_dir} were built with {previous}; "
+                f"rerun with the same settings or pass --restart"
+            )
+    else:
+        with open(config_path, 'w') as f:
+            json.dump(config, f)
+
+
+def build_shards(
+    corpus: str,
+    shard_dir: Path,
+    model_name: str = DEFAULT_MODEL_NAME,
+    workers: int = 4,
+    shard_size: int = 10000,
+    batch_size: int = 64,
+    threads_per_worker: int = 1,
+    kb_format: bool = False
+) -> Dict:
+    """
+    Embed the corpus into shard files, skipping shards a previous build
+    completed from identical documents (count and content hash match).
+
+    Args:
+        corpus: Corpus file
+        shard_dir: Directory for shard checkpoints
+        model_name: Embedding model
+        workers: Worker processes
+        shard_size: Documents per shard
+        batch_size: Encode batch size within a worker
+        threads_per_worker: Torch threads per worker (0 leaves the default)
+        kb_format: Treat the corpus as a knowledge_base.json
+
+    Returns:
+        Dictionary with shard count, documents embedded and skipped, stale
+        shards removed, and docs/s
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    _check_build_config(shard_dir, {'corpus': str(Path(corpus).resolve()), 'model_name': model_name,
+                                    'shard_size': shard_size, 'kb_format': kb_format})
+
+    stats = {'shards': 0, 'embedded': 0, 'skipped': 0}
+    started = time.perf_counter()
+
+    def report(done):
+        for future in done:
+            stats['embedded'] += future.result()
+            pending.discard(future)
+        elapsed = time.perf_counter() - started
+        print(f"  {stats['embedded']} embedded, {stats['skipped']} resumed - "
+              f"{stats['embedded'] / elapsed:.1f} docs/s", flush=True)
+
+    pending = set()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_name, threads_per_worker)
+    ) as pool:
+        shard: List[Dict] = []
+        shard_id = 0
+
+        def submit():
+            nonlocal shard, shard_id
+            digest = _shard_digest(shard)
+            if _shard_done(shard_dir, shard_id, shard, digest):
+                stats['skipped'] += len(shard)
+            else:
+                # Bound queued shards so the corpus is never held in memory
+                while len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    report(done)
+                pending.add(pool.submit(_encode_shard, str(shard_dir), shard_id, shard, batch_size, digest))
+            stats['shards'] += 1
+            shard = []
+            shard_id += 1
+
+        for doc in iter_corpus(corpus, kb_format):
+            shard.append(doc)
+            if len(shard) >= shard_size:
+                submit()
+        if shard:
+            submit()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            report(done)
+
+    stats['stale_removed'] = _remove_shards_from(shard_dir, stats['shards'])
+    elapsed = time.perf_counter() - started
+    stats['elapsed_s'] = round(elapsed, 2)
+    stats['docs_per_s'] = round(stats['embedded'] / elapsed, 1) if elapsed else 0
+    return stats
+
+
+def merge_shards(
+    shard_dir: Path,
+    output_dir: Path,
+    model_name: str = DEFAULT_MODEL_NAME,
+    shard_count: Optional[int] = None
+) -> Dict:
+    """
+    Merge shard files into the index directory LocalRetriever loads.
+
+    Embeddings are copied shard by shard into a memory-mapped array, so
+    the merge never holds the whole index in memory. A content hash of
+    documents and embeddings is stored in the manifest as 'fingerprint'.
+
+    Args:
+        shard_dir: Directory of completed shards
+        output_dir: Index directory to write
+        model_name: Embedding model the shards were built with
+        shard_count: Shards the corpus produced (default: consecutive
+            completed shards from shard 0)
+
+    Returns:
+        The written manifest
+
+    Raises:
+        ValueError: If one of the first shard_count shards is incomplete
+    """
+    if shard_count is None:
+        shard_count = 0
+        while (shard_dir / f"shard-{shard_count:06d}.json").exists():
+            shard_count += 1
+
+    shard_files = [shard_dir / f"shard-{i:06d}.npy" for i in range(shard_count)]
+    missing = [path.name for path in shard_files if not path.with_suffix(".json").exists()]
+    if missing:
+        raise ValueError(f"Incomplete shards in {shard_dir}: {', '.join(missing[:5])}")
+    shapes = [np.load(path, mmap_mode='r').shape for path in shard_files]
+    total = sum(shape[0] for shape in shapes)
+    dim = shapes[0][1] if shapes else 0
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    emb_tmp = output_dir / ("tmp-" + EMBEDDINGS_FILE)
+    docs_tmp = output_dir / (DOCUMENTS_FILE + ".tmp")
+
+    merged = np.lib.format.open_memmap(emb_tmp, mode='w+', dtype=np.float32, shape=(total, dim))
+    digest = hashlib.sha256()
+    row = 0
+    with open(docs_tmp, 'w', encoding='utf-8') as docs_out:
+        for path, shape in zip(shard_files, shapes):
+            shard = np.load(path, mmap_mode='r')
+            merged[row:row + shape[0]] = shard
+            digest.update(np.ascontiguousarray(shard).tobytes())
+            row += shape[0]
+            with open(path.with_suffix(".docs.jsonl"), 'r', encoding='utf-8') as docs_in:
+                for line in docs_in:
+                    docs_out.write(line)
+                    digest.update(line.encode('utf-8'))
+    merged.flush()
+    del merged
+
+    os.replace(emb_tmp, output_dir / EMBEDDINGS_FILE)
+    os.replace(docs_tmp, output_dir / DOCUMENTS_FILE)
+
+    manifest = {
+        'model_name': model_name,
+        'documents': total,
+        'dimension': dim,
+        'shards': len(shard_files),
+        'fingerprint': digest.hexdigest()
+    }
+    with open(output_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def index_fingerprint(index_dir: str) -> str:
+    """
+    Content hash of an index directory, as recorded by merge_shards.
+
+    Args:
+        index_dir: Index directory
+
+    Returns:
+        SHA-256 hex digest
+    """
+    with open(Path(index_dir) / MANIFEST_FILE, 'r') as f:
+        return json.load(f)['fingerprint']
+
+
+def load_index(index_dir: str, mmap: bool = True):
+    """
+    Load an index directory written by merge_shards.
+
+    Args:
+        index_dir: Index directory
+        mmap: Memory-map embeddings instead of reading them into RAM
+
+    Returns:
+        (manifest, documents, embeddings)
+    """
+    index_dir = Path(index_dir)
+    with open(index_dir / MANIFEST_FILE, 'r') as f:
+        manifest = json.load(f)
+
+    with open(index_dir / DOCUMENTS_FILE, 'r', encoding='utf-8') as f:
+        documents = [json.loads(line) for line in f]
+
+    embeddings = np.load(index_dir / EMBEDDINGS_FILE, mmap_mode='r' if mmap else None)
+    return manifest, documents, embeddings
+
+
+def main():
+    """Build an index from a corpus, resuming any previous partial build."""
+    parser = argparse.ArgumentParser(description="Build a retrieval index in parallel, resumable shards")
+    parser.add_argument("corpus", help="Corpus JSONL (or knowledge_base.json with --kb)")
+    parser.add_argument("--output", required=True, help="Index directory to write")
+    parser.add_argument("--kb", action="store_true", help="Corpus is a knowledge_base.json")
+    parser.add_argument("--shard-dir", help="Shard checkpoint directory (default: OUTPUT/shards)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=10000, help="Documents per shard")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encode batch size per worker")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--restart", action="store_true", help="Discard existing shards")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    shard_dir = Path(args.shard_dir) if args.shard_dir else output_dir / "shards"
+
+    if args.restart and shard_dir.exists():
+        for path in shard_dir.iterdir():
+            path.unlink()
+
+    print(f"Embedding {args.corpus} with {args.workers} workers...")
+    stats = build_shards(
+        args.corpus, shard_dir,
+        model_name=args.model,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        batch_size=args.batch_size,
+        threads_per_worker=args.threads_per_worker,
+        kb_format=args.kb
+    )
+    print(f"Shards: {stats['shards']} ({stats['embedded']} documents embedded, "
+          f"{stats['skipped']} resumed, {stats['stale_removed']} stale shards removed) "
+          f"in {stats['elapsed_s']}s - {stats['docs_per_s']} docs/s")
+
+    manifest = merge_shards(shard_dir, output_dir, args.model, stats['shards'])
+    print(f"Wrote index {output_dir}: {manifest['documents']} documents, dimension {manifest['dimension']}")
+
+
+if __name__ == "__main__":
+    main()
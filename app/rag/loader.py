@@ -4,17 +4,23 @@ Loads and chunks the knowledge base JSON into retrievable documents.
 """
 import json
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 
 
-def load_knowledge_base() -> List[Dict[str, str]]:
+DEFAULT_KB_PATH = Path(__file__).parent / "knowledge_base.json"
+
+
+def load_knowledge_base(kb_path: Optional[Union[str, Path]] = None) -> List[Dict[str, str]]:
     """
     Load knowledge base and convert to document chunks.
     
+    Args:
+        kb_path: Knowledge base JSON file (default: bundled knowledge_base.json)
+    
     Returns:
         List of documents with 'content' and 'metadata' fields
     """
-    kb_path = Path(__file__).parent / "knowledge_base.json"
+    kb_path = Path(kb_path) if kb_path else DEFAULT_KB_PATH
     
     with open(kb_path, 'r') as f:
         data = json.load(f)
@@ -2,72 +2,280 @@
 RAG Retriever
 Semantic search over knowledge base using local embeddings (zero-cost).
 """
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from sentence_transformers import SentenceTransformer
 import numpy as np
+import os
+import sys
+import threading
+from collections import OrderedDict
 from .loader import load_knowledge_base
 
 
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Metadata filter: field -> required value, or list of accepted values
+Filters = Dict[str, Union[str, List[str]]]
+
+# Embedding models shared by every retriever in the process
+_models: Dict[str, SentenceTransformer] = {}
+_models_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = DEFAULT_MODEL_NAME) -> SentenceTransformer:
+    """
+    Get or load a shared embedding model.
+    
+    Args:
+        model_name: HuggingFace model name
+        
+    Returns:
+        SentenceTransformer instance, loaded once per process
+    """
+    with _models_lock:
+        if model_name not in _models:
+            print(f"Loading embedding model: {model_name}...")
+            _models[model_name] = SentenceTransformer(model_name)
+        return _models[model_name]
+
+
 class LocalRetriever:
     """
     Local semantic search using sentence-transformers.
     No external API calls - completely free.
     """
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        kb_path: Optional[str] = None,
+        index_path: Optional[str] = None
+    ):
         """
         Initialize retriever with local embedding model.
         
         Args:
             model_name: HuggingFace model name (default: all-MiniLM-L6-v2)
+            kb_path: Knowledge base JSON file (default: bundled knowledge base)
+            index_path: Prebuilt index directory from app/rag/index_builder.py;
+                used instead of embedding kb_path at startup
         """
-        print(f"Loading embedding model: {model_name}...")
-        self.model = SentenceTransformer(model_name)
+        self.model = get_embedding_model(model_name)
+        
+        if index_path:
+            from .index_builder import load_index
+            manifest, self.documents, self.embeddings = load_index(index_path)
+            if manifest['model_name'] != model_name:
+                raise ValueError(
+                    f"Index {index_path} was built with {manifest['model_name']}, not {model_name}"
+                )
+            self.contents = [doc['content'] for doc in self.documents]
+        else:
+            # Load and embed knowledge base
+            self.documents = load_knowledge_base(kb_path)
+            self.contents = [doc['content'] for doc in self.documents]
+            
+            print("Embedding knowledge base...")
+            self.embeddings = self.model.encode(self.contents, convert_to_numpy=True)
         
-        # Load and embed knowledge base
-        self.documents = load_knowledge_base()
-        self.contents = [doc['content'] for doc in self.documents]
+        # Pre-compute document norms so each query only normalizes itself
+        self.norms = np.linalg.norm(self.embeddings, axis=1)
+        self.postings = self._build_postings()
         
-        print("Embedding knowledge base...")
-        self.embeddings = self.model.encode(self.contents, convert_to_numpy=True)
+        # Query embeddings kept (repeated questions skip the model)
+        self.query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.query_cache_size = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024"))
+        self.cache_lock = threading.Lock()
+        self.index_bytes = self._index_bytes()
         print(f"Indexed {len(self.documents)} documents")
     
-    def retrieve(self, query: str, top_k: int = 2) -> List[str]:
+    def encode_query(self, query: str) -> np.ndarray:
         """
-        Retrieve top-k most relevant documents for a query.
+        Embed a query, reusing cached embeddings for repeated questions.
+        
+        Args:
+            query: User question
+            
+        Returns:
+            Query embedding
+        """
+        key = " ".join(query.lower().split())
+        with self.cache_lock:
+            if key in self.query_cache:
+                self.query_cache.move_to_end(key)
+                return self.query_cache[key]
+        
+        embedding = self.model.encode([query], convert_to_numpy=True)[0]
+        self.prime_query_cache({key: embedding})
+        return embedding
+    
+    def prime_query_cache(self, embeddings: Dict[str, np.ndarray]):
+        """
+        Add precomputed query embeddings (e.g. from a warm-up snapshot).
+        
+        Args:
+            embeddings: Mapping of query text to embedding
+        """
+        with self.cache_lock:
+            for query, embedding in embeddings.items():
+                key = " ".join(query.lower().split())
+                self.query_cache[key] = np.asarray(embedding, dtype=self.embeddings.dtype)
+                self.query_cache.move_to_end(key)
+            while len(self.query_cache) > self.query_cache_size:
+                self.query_cache.popitem(last=False)
+    
+    def _build_postings(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Build posting lists of document rows for every metadata field value.
+        
+        Returns:
+            Mapping field -> value -> sorted array of row indices
+        """
+        rows: Dict[str, Dict[str, List[int]]] = {}
+        for i, doc in enumerate(self.documents):
+            for field, value in doc['metadata'].items():
+                rows.setdefault(field, {}).setdefault(str(value), []).append(i)
+        
+        return {
+            field: {value: np.array(indices, dtype=np.int64) for value, indices in values.items()}
+            for field, values in rows.items()
+        }
+    
+    def filter_rows(self, filters: Optional[Filters]) -> Optional[np.ndarray]:
+        """
+        Resolve metadata filters to the matching document rows.
+        
+        Values within a field are OR-ed; fields are AND-ed.
+        
+        Args:
+            filters: e.g. {'type': 'plan'} or {'policy_name': ['refund', 'support']}
+            
+        Returns:
+            Sorted row indices, or None if there are no filters (all rows)
+        """
+        if not filters:
+            return None
+        
+        rows = None
+        for field, values in filters.items():
+            if isinstance(values, str):
+                values = [values]
+            postings = self.postings.get(field, {})
+            matches = [postings[str(v)] for v in values if str(v) in postings]
+            field_rows = np.unique(np.concatenate(matches)) if matches else np.array([], dtype=np.int64)
+            rows = field_rows if rows is None else np.intersect1d(rows, field_rows, assume_unique=True)
+        
+        return rows
+    
+    def _index_bytes(self) -> int:
+        """Size in bytes of embeddings, norms, document texts and postings."""
+        text_bytes = sum(sys.getsizeof(content) for content in self.contents)
+        posting_bytes = sum(
+            rows.nbytes for values in self.postings.values() for rows in values.values()
+        )
+        return self.embeddings.nbytes + self.norms.nbytes + text_bytes + posting_bytes
+    
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory held by this retriever (excluding the shared model).
+        
+        The index size is fixed after loading; the query cache is measured
+        on each call since it grows with traffic and warm-up priming.
+        
+        Returns:
+            Size in bytes of the index plus cached query embeddings
+        """
+        with self.cache_lock:
+            cache_bytes = sum(
+                sys.getsizeof(key) + embedding.nbytes for key, embedding in self.query_cache.items()
+            )
+        return self.index_bytes + cache_bytes
+    
+    def retrieve_with_scores(self, query: str, top_k: int = 2, filters: Optional[Filters] = None) -> List[Dict]:
+        """
+        Retrieve top-k most relevant documents along with their similarity.
         
         Args:
             query: User question
             top_k: Number of documents to retrieve
+            filters: Optional metadata filters; only matching rows are scored
             
         Returns:
-            List of relevant document contents
+            List of dicts with 'content', 'metadata' and 'score' (cosine
+            similarity), ordered from most to least similar
         """
+        rows = self.filter_rows(filters)
+        if not self.documents or (rows is not None and len(rows) == 0):
+            return []
+        
         # Embed query
-        query_embedding = self.model.encode([query], convert_to_numpy=True)[0]
+        query_embedding = self.encode_query(query)
+        
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        norms = self.norms if rows is None else self.norms[rows]
         
         # Compute cosine similarity
-        similarities = np.dot(self.embeddings, query_embedding) / (
-            np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_embedding)
+        similarities = np.dot(embeddings, query_embedding) / (
+            norms * np.linalg.norm(query_embedding)
         )
         
-        # Get top-k indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Get top-k indices (positions within the scored rows)
+        top_positions = np.argsort(similarities)[::-1][:top_k]
         
-        # Return top documents
-        return [self.contents[i] for i in top_indices]
+        results = []
+        for position in top_positions:
+            i = position if rows is None else rows[position]
+            results.append({
+                'content': self.contents[i],
+                'metadata': self.documents[i]['metadata'],
+                'score': float(similarities[position])
+            })
+        return results
+    
+    def retrieve(self, query: str, top_k: int = 2, filters: Optional[Filters] = None) -> List[str]:
+        """
+        Retrieve top-k most relevant documents for a query.
+        
+        Args:
+            query: User question
+            top_k: Number of documents to retrieve
+            filters: Optional metadata filters (see filter_rows)
+            
+        Returns:
+            List of relevant document contents
+        """
+        return [doc['content'] for doc in self.retrieve_with_scores(query, top_k, filters)]
 
 
 # Global retriever instance (initialized once)
 _retriever = None
+_retriever_lock = threading.Lock()
+
 
+def configured_index_path() -> Optional[str]:
+    """Prebuilt index directory for the global retriever (RAG_INDEX_PATH), if set."""
+    return os.getenv("RAG_INDEX_PATH") or None
 
-def get_retriever() -> LocalRetriever:
-    """Get or create global retriever instance."""
+
+def get_retriever(tenant: Optional[str] = None) -> LocalRetriever:
+    """
+    Get or create a retriever instance.
+    
+    Args:
+        tenant: Tenant whose knowledge base to search (default: bundled KB)
+        
+    Returns:
+        Global retriever, or the tenant's retriever from the tenant registry
+    """
     global _retriever
-    if _retriever is None:
-        _retriever = LocalRetriever()
-    return _retriever
+    if tenant:
+        from .tenants import get_tenant_registry
+        return get_tenant_registry().get(tenant)
+    
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = LocalRetriever(index_path=configured_index_path())
+        return _retriever
 
 
 if __name__ == "__main__":
@@ -84,6 +292,6 @@ if __name__ == "__main__":
         print(f"\n{'='*60}")
         print(f"Query: {query}")
         print(f"{'='*60}")
-        results = retriever.retrieve(query, top_k=2)
+        results = retriever.retrieve_with_scores(query, top_k=2)
         for i, result in enumerate(results, 1):
-            print(f"\n{i}. {result}")
+            print(f"\n{i}. [{result['score']:.3f}] {result['content']}")
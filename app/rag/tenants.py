@@ -0,0 +1,205 @@
+"""
+Tenant Retrievers
+Per-tenant knowledge base indexes sharing one embedding model, loaded on
+demand and evicted least-recently-used under a total memory budget.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from .retriever import LocalRetriever, DEFAULT_MODEL_NAME
+
+
+class UnknownTenantError(KeyError):
+    """Raised when no knowledge base source is known for a tenant."""
+
+
+class TenantRegistry:
+    """
+    Registry of tenant-scoped retrievers.
+
+    Each tenant's knowledge base comes from an explicitly registered JSON
+    file or from `<kb_dir>/<tenant>.json`. Indexes load on first use; when
+    the total size of resident retrievers (index plus query cache,
+    re-measured on every access) exceeds the memory budget, the least
+    recently used tenants are evicted (the shared embedding model is never
+    evicted).
+    """
+
+    def __init__(
+        self,
+        kb_dir: Optional[str] = None,
+        memory_budget_mb: float = 256,
+        model_name: str = DEFAULT_MODEL_NAME
+    ):
+        """
+        Initialize registry.
+
+        Args:
+            kb_dir: Directory containing one `<tenant>.json` per tenant
+            memory_budget_mb: Total memory allowed for resident indexes
+            model_name: Embedding model shared by all tenants
+        """
+        self.kb_dir = Path(kb_dir) if kb_dir else None
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.model_name = model_name
+
+        self.sources: Dict[str, Path] = {}
+        self.retrievers: "OrderedDict[str, LocalRetriever]" = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+        self.metrics: Dict[str, Dict] = {}
+
+        self.lock = threading.Lock()
+        self.load_locks: Dict[str, threading.Lock] = {}
+
+    def register(self, tenant: str, kb_path: str):
+        """
+        Register (or change) a tenant's knowledge base source.
+
+        Args:
+            tenant: Tenant identifier
+            kb_path: Knowledge base JSON file
+        """
+        with self.lock:
+            self.sources[tenant] = Path(kb_path)
+            # Drop a stale index built from the previous source
+            if tenant in self.retrievers:
+                del self.retrievers[tenant]
+                del self.sizes[tenant]
+
+    def resolve_source(self, tenant: str) -> Path:
+        """
+        Find a tenant's knowledge base file.
+
+        Args:
+            tenant: Tenant identifier
+
+        Returns:
+            Path to the knowledge base JSON
+
+        Raises:
+            UnknownTenantError: If the tenant has no knowledge base
+        """
+        if tenant in self.sources:
+            return self.sources[tenant]
+
+        if self.kb_dir is not None:
+            path = self.kb_dir / f"{Path(tenant).name}.json"
+            if path.exists():
+                return path
+
+        raise UnknownTenantError(f"No knowledge base for tenant: {tenant}")
+
+    def _tenant_metrics(self, tenant: str) -> Dict:
+        """Get (creating if needed) a tenant's metric counters."""
+        if tenant not in self.metrics:
+            self.metrics[tenant] = {
+                'hits': 0,
+                'loads': 0,
+                'evictions': 0,
+                'load_time_s': 0.0,
+                'last_load_time_s': 0.0
+            }
+        return self.metrics[tenant]
+
+    def get(self, tenant: str) -> LocalRetriever:
+        """
+        Get a tenant's retriever, loading its index if not resident.
+
+        Args:
+            tenant: Tenant identifier
+
+        Returns:
+            LocalRetriever over the tenant's knowledge base
+        """
+        with self.lock:
+            if tenant in self.retrievers:
+                return self._hit(tenant)
+            load_lock = self.load_locks.setdefault(tenant, threading.Lock())
+
+        # One loader per tenant; other requests for it wait instead of loading twice
+        with load_lock:
+            with self.lock:
+                if tenant in self.retrievers:
+                    return self._hit(tenant)
+                source = self.resolve_source(tenant)
+
+            started = time.perf_counter()
+            retriever = LocalRetriever(model_name=self.model_name, kb_path=str(source))
+            load_time = time.perf_counter() - started
+
+            with self.lock:
+                metrics = self._tenant_metrics(tenant)
+                metrics['loads'] += 1
+                metrics['load_time_s'] += load_time
+                metrics['last_load_time_s'] = load_time
+
+                self.retrievers[tenant] = retriever
+                self.sizes[tenant] = retriever.memory_bytes()
+                self._evict(keep=tenant)
+
+            return retriever
+
+    def _hit(self, tenant: str) -> LocalRetriever:
+        """Serve a resident retriever, re-measuring its size (lock held)."""
+        retriever = self.retrievers[tenant]
+        self.retrievers.move_to_end(tenant)
+        self._tenant_metrics(tenant)['hits'] += 1
+        # The query cache grows after loading (traffic, warm-up priming)
+        self.sizes[tenant] = retriever.memory_bytes()
+        self._evict(keep=tenant)
+        return retriever
+
+    def _evict(self, keep: str):
+        """Evict least recently used tenants until within budget (lock held)."""
+        while sum(self.sizes.values()) > self.memory_budget and len(self.retrievers) > 1:
+            tenant = next(iter(self.retrievers))
+            if tenant == keep:
+                break
+            del self.retrievers[tenant]
+            del self.sizes[tenant]
+            self.metrics[tenant]['evictions'] += 1
+
+    def get_metrics(self) -> Dict:
+        """
+        Get per-tenant hit, load and eviction metrics plus memory usage.
+
+        Returns:
+            Dictionary with 'tenants' (per-tenant metrics) and totals
+        """
+        with self.lock:
+            tenants = {}
+            for tenant, metrics in self.metrics.items():
+                stats = dict(metrics)
+                requests = stats['hits'] + stats['loads']
+                stats['hit_rate'] = f"{(stats['hits'] / requests * 100):.1f}%" if requests else "0%"
+                stats['resident'] = tenant in self.retrievers
+                stats['memory_bytes'] = self.sizes.get(tenant, 0)
+                tenants[tenant] = stats
+
+            return {
+                'tenants': tenants,
+                'resident': len(self.retrievers),
+                'memory_bytes': sum(self.sizes.values()),
+                'memory_budget_bytes': self.memory_budget
+            }
+
+
+# Global tenant registry (initialized once)
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tenant_registry() -> TenantRegistry:
+    """Get or create global tenant registry configured from environment."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TenantRegistry(
+                kb_dir=os.getenv("KB_TENANTS_DIR"),
+                memory_budget_mb=float(os.getenv("KB_MEMORY_BUDGET_MB", "256"))
+            )
+        return _registry
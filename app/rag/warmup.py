@@ -0,0 +1,378 @@
+"""
+Cache Pre-warming
+Precomputes query embeddings, retrieval results and grounded answers for the
+most frequent questions, and saves them to a snapshot new workers load at
+startup. Snapshots are ignored once the knowledge base they were built from
+changes.
+
+Usage:
+    python app/rag/warmup.py --transcripts transcripts.jsonl --faq faq.txt \\
+        --demo --top 50 --output warm_snapshot.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.fallbacks import is_question, classify_intent_by_keywords
+from app.rag.loader import DEFAULT_KB_PATH
+from app.transcripts import DEMO_QUESTIONS, user_messages, load_demo_script
+
+
+SNAPSHOT_VERSION = 2  # 2: records answer_source
+DEFAULT_SNAPSHOT_PATH = "warm_snapshot.json"
+
+
+def normalize_question(question: str) -> str:
+    """
+    Canonical cache key for a question.
+
+    Lowercases, unifies apostrophes, collapses whitespace and drops
+    trailing punctuation so trivial variants share an entry.
+    """
+    text = " ".join(question.lower().replace('’', "'").split())
+    return text.rstrip(" ?!.")
+
+
+def kb_fingerprint(kb_path: Optional[str] = None) -> str:
+    """
+    Content hash of a knowledge base file.
+
+    Args:
+        kb_path: Knowledge base JSON (default: bundled knowledge base)
+
+    Returns:
+        SHA-256 hex digest
+    """
+    with open(kb_path or DEFAULT_KB_PATH, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_fingerprint(tenant: str = "") -> str:
+    """
+    Fingerprint of whatever the tenant's retriever searches.
+
+    The global retriever serves a prebuilt index when RAG_INDEX_PATH is
+    set, so that index's content hash is used instead of the KB file's.
+
+    Args:
+        tenant: Tenant identifier ("" for the global retriever)
+
+    Returns:
+        SHA-256 hex digest
+    """
+    if not tenant:
+        from app.rag.retriever import configured_index_path
+        index_path = configured_index_path()
+        if index_path:
+            from app.rag.index_builder import index_fingerprint
+            return index_fingerprint(index_path)
+    return kb_fingerprint(resolve_kb_path(tenant))
+
+
+def resolve_kb_path(tenant: str = "") -> Path:
+    """Knowledge base file answering questions for a tenant."""
+    if not tenant:
+        return DEFAULT_KB_PATH
+    from app.rag.tenants import get_tenant_registry
+    return get_tenant_registry().resolve_source(tenant)
+
+
+class WarmCache:
+    """
+    Precomputed answers, retrieval results and query embeddings for one
+    tenant's knowledge base.
+    """
+
+    def __init__(self, tenant: str = "", fingerprint: str = "", answer_source: str = "gemini"):
+        """
+        Initialize an empty cache.
+
+        Args:
+            tenant: Tenant the cache answers for ("" for the bundled KB)
+            fingerprint: source_fingerprint() of the knowledge base or index it was built from
+            answer_source: LLM that generated the cached answers ("fake" for dry runs)
+        """
+        self.tenant = tenant
+        self.fingerprint = fingerprint
+        self.answer_source = answer_source
+        self.embeddings: Dict[str, List[float]] = {}  # keyed by question as asked
+        self.retrievals: Dict[str, List[Dict]] = {}
+        self.answers: Dict[str, str] = {}
+
+    def lookup_answer(self, question: str) -> Optional[str]:
+        """Cached answer for a question, if warmed."""
+        return self.answers.get(normalize_question(question))
+
+    def lookup_retrieval(self, question: str) -> Optional[List[Dict]]:
+        """Cached retrieval results for a question, if warmed."""
+        return self.retrievals.get(normalize_question(question))
+
+    def save(self, path: str):
+        """
+        Write the snapshot atomically.
+
+        Args:
+            path: Snapshot JSON file
+        """
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'created': datetime.now().isoformat(),
+            'tenant': self.tenant,
+            'kb_fingerprint': self.fingerprint,
+            'answer_source': self.answer_source,
+            'embeddings': self.embeddings,
+            'retrievals': self.retrievals,
+            'answers': self.answers
+        }
+        tmp_path = Path(str(path) + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["WarmCache"]:
+        """
+        Load a snapshot if it still matches its knowledge base.
+
+        Args:
+            path: Snapshot JSON file
+
+        Returns:
+            WarmCache, or None if the snapshot is missing, unreadable, from
+            another format version, built from a different knowledge base or
+            holding answers from the fake LLM
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return None
+
+        if snapshot.get('answers') and snapshot.get('answer_source') != 'gemini':
+            print(f"Warm snapshot {path} holds {snapshot.get('answer_source')} LLM answers - ignoring")
+            return None
+
+        tenant = snapshot.get('tenant', "")
+        try:
+            current = source_fingerprint(tenant)
+        except (OSError, KeyError, ValueError):
+            return None
+        if snapshot.get('kb_fingerprint') != current:
+            print(f"Warm snapshot {path} is stale (knowledge base or index changed) - ignoring")
+            return None
+
+        cache = cls(tenant, current)
+        cache.embeddings = snapshot.get('embeddings', {})
+        cache.retrievals = snapshot.get('retrievals', {})
+        cache.answers = snapshot.get('answers', {})
+        return cache
+
+
+# Installed warm caches by tenant
+_warm_caches: Dict[str, WarmCache] = {}
+_warm_lock = threading.Lock()
+
+
+def get_warm_cache(tenant: str = "") -> Optional[WarmCache]:
+    """Get the installed warm cache for a tenant, if any."""
+    return _warm_caches.get(tenant or "")
+
+
+def install_warm_cache(cache: WarmCache, prime_retriever: bool = True):
+    """
+    Make a warm cache active for its tenant.
+
+    Args:
+        cache: Loaded or freshly built cache
+        prime_retriever: Also load its query embeddings into the retriever
+    """
+    with _warm_lock:
+        _warm_caches[cache.tenant] = cache
+
+    if prime_retriever and cache.embeddings:
+        from app.rag.retriever import get_retriever
+        get_retriever(cache.tenant).prime_query_cache(cache.embeddings)
+
+
+def snapshot_path() -> str:
+    """Configured snapshot file (AUTOSTREAM_WARM_SNAPSHOT)."""
+    return os.getenv("AUTOSTREAM_WARM_SNAPSHOT", DEFAULT_SNAPSHOT_PATH)
+
+
+def load_warm_snapshot(path: Optional[str] = None) -> bool:
+    """
+    Load and install a snapshot at worker startup.
+
+    Args:
+        path: Snapshot JSON file (default: snapshot_path())
+
+    Returns:
+        True if a valid snapshot was installed
+    """
+    path = path or snapshot_path()
+    if not Path(path).exists():
+        return False
+
+    cache = WarmCache.load(path)
+    if cache is None:
+        return False
+
+    install_warm_cache(cache)
+    print(f"Loaded warm cache: {len(cache.answers)} answers, {len(cache.embeddings)} queries")
+    return True
+
+
+def collect_questions(
+    transcripts: Iterable[str] = (),
+    demo_file: Optional[str] = None,
+    faq_file: Optional[str] = None,
+    top_n: int = 50
+) -> List[str]:
+    """
+    Pick the most frequent questions to warm.
+
+    Transcript and demo messages count only if they look like product
+    questions; every curated FAQ line is included.
+
+    Args:
+        transcripts: JSONL transcript files (app/batch.py input format)
+        demo_file: Demo questions file ("You: ..." per line)
+        faq_file: Curated FAQ file, one question per line
+        top_n: Number of transcript/demo questions to keep
+
+    Returns:
+        Questions, FAQ entries first, then by descending frequency
+    """
+    counts: Counter = Counter()
+    originals: Dict[str, str] = {}
+
+    def count(message: str):
+        if is_question(message) and classify_intent_by_keywords(message) == 'inquiry':
+            key = normalize_question(message)
+            counts[key] += 1
+            originals.setdefault(key, message)
+
+    for path in transcripts:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    conversation = json.loads(line)
+                except ValueError:
+                    continue  # blank or corrupt line
+                if not isinstance(conversation, dict):
+                    continue
+                for message in user_messages(conversation):
+                    count(message)
+
+    if demo_file:
+        for message in load_demo_script(Path(demo_file)):
+            count(message)
+
+    faq = []
+    if faq_file:
+        with open(faq_file, 'r', encoding='utf-8') as f:
+            faq = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    seen = {normalize_question(q) for q in faq}
+    frequent = [originals[key] for key, _ in counts.most_common() if key not in seen]
+    return faq + frequent[:top_n]
+
+
+def build_warm_cache(
+    questions: List[str],
+    tenant: str = "",
+    with_answers: bool = True,
+    answer_source: str = "gemini"
+) -> WarmCache:
+    """
+    Precompute embeddings, retrieval results and answers for questions.
+
+    Answers go through the same path as rag_node; degraded answers (LLM
+    unavailable) are not cached.
+
+    Args:
+        questions: Questions to warm
+        tenant: Tenant whose knowledge base to use
+        with_answers: Also generate LLM answers (otherwise retrieval only)
+        answer_source: LLM behind the current scheduler, recorded in the snapshot
+
+    Returns:
+        Populated WarmCache
+    """
+    from app.nodes.rag_node import retrieve_candidates, generate_answer
+    from app.rag.retriever import get_retriever
+
+    retriever = get_retriever(tenant)
+    cache = WarmCache(tenant, source_fingerprint(tenant), answer_source)
+
+    for question in questions:
+        key = normalize_question(question)
+        cache.embeddings[question] = retriever.encode_query(question).tolist()
+        candidates = retrieve_candidates(question, 'inquiry', retriever)
+        cache.retrievals[key] = candidates
+
+        if with_answers:
+            answer, degraded = generate_answer(question, 'inquiry', retriever, candidates)
+            if not degraded:
+                cache.answers[key] = answer
+
+    return cache
+
+
+def main():
+    """Build a warm-up snapshot from logs and FAQ lists."""
+    parser = argparse.ArgumentParser(description="Pre-warm AutoStream retrieval and answer caches")
+    parser.add_argument("--transcripts", nargs="*", default=[], help="Transcript JSONL files")
+    parser.add_argument("--faq", help="Curated FAQ file, one question per line")
+    parser.add_argument("--demo", action="store_true", help="Include demo/demo_questions.txt")
+    parser.add_argument("--top", type=int, default=50, help="Most frequent questions to warm")
+    parser.add_argument("--tenant", default="", help="Tenant knowledge base to warm")
+    parser.add_argument("--output", help="Snapshot file (default: AUTOSTREAM_WARM_SNAPSHOT or warm_snapshot.json)")
+    parser.add_argument("--no-answers", action="store_true", help="Skip LLM answers (embeddings and retrieval only)")
+    parser.add_argument("--fake-llm", action="store_true",
+                        help="Use the local fake LLM (dry run; workers refuse to load its answers)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv(override=True)
+
+    if args.fake_llm:
+        from app.llm.fake import FakeLLM, scripted_responder
+        from app.llm.scheduler import LLMScheduler, set_scheduler
+
+        fake = FakeLLM(responder=scripted_responder)
+        set_scheduler(LLMScheduler(client_factory=lambda temperature: fake, rate_per_minute=1_000_000))
+
+    demo_file = str(DEMO_QUESTIONS) if args.demo else None
+    questions = collect_questions(args.transcripts, demo_file, args.faq, args.top)
+    if not questions:
+        print("No questions found to warm.")
+        return
+
+    cache = build_warm_cache(
+        questions, args.tenant,
+        with_answers=not args.no_answers,
+        answer_source='fake' if args.fake_llm else 'gemini'
+    )
+    output = args.output or snapshot_path()
+    cache.save(output)
+    print(f"Wrote {output}: {len(cache.embeddings)} questions, {len(cache.answers)} answers")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,14 @@ class AgentState(TypedDict):
         lead_info: Dictionary with name, email, platform
         tool_called: Flag to prevent duplicate tool execution
         collecting_lead: Flag to track if we're in lead collection mode
+        degraded: True if this turn's response used local fallbacks
+        tenant: Brand whose knowledge base answers questions (empty for
+            the bundled knowledge base)
     """
     messages: List[BaseMessage]
     intent: str
     lead_info: Dict[str, str]
     tool_called: bool
     collecting_lead: bool
+    degraded: bool
+    tenant: str
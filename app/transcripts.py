@@ -0,0 +1,50 @@
+"""
+Transcript Helpers
+Reading stored conversations and the demo script as lists of user messages.
+"""
+from pathlib import Path
+from typing import Dict, List
+
+
+DEMO_QUESTIONS = Path(__file__).parent.parent / "demo" / "demo_questions.txt"
+
+
+def user_messages(conversation: Dict) -> List[str]:
+    """
+    Extract the user messages to replay from a stored conversation.
+
+    Args:
+        conversation: Parsed JSONL record
+
+    Returns:
+        User messages in order
+    """
+    if 'turns' in conversation:
+        return [str(turn) for turn in conversation['turns']]
+
+    return [
+        message['content']
+        for message in conversation.get('messages', [])
+        if message.get('role') in ['user', 'human']
+    ]
+
+
+def load_demo_script(path: Path = DEMO_QUESTIONS) -> List[str]:
+    """
+    Load the demo conversation as a list of user messages.
+
+    Args:
+        path: Demo questions file ("You: ..." per line)
+
+    Returns:
+        User messages, without the closing quit command
+    """
+    messages = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            message = line.strip()
+            if message.startswith("You:"):
+                message = message[len("You:"):].strip()
+            if message and message.lower() not in ['quit', 'exit', 'bye']:
+                messages.append(message)
+    return messages
@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# Embed with the deterministic fake model, in this process and in workers
+fakes = str(Path(__file__).parent / "fakes")
+sys.path.insert(0, fakes)
+os.environ['PYTHONPATH'] = os.pathsep.join(filter(None, [fakes, os.environ.get('PYTHONPATH')]))
@@ -0,0 +1,27 @@
+"""
+Deterministic stand-in for sentence_transformers used by the test suite.
+
+Embeds text as a hashed bag of words, so tests run offline and fast and
+similar texts still score as similar.
+"""
+import re
+import zlib
+
+import numpy as np
+
+
+DIMENSION = 64
+
+
+class SentenceTransformer:
+    """Hashed bag-of-words embedding model."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=32, show_progress_bar=False, **kwargs):
+        embeddings = np.zeros((len(texts), DIMENSION), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9$]+", text.lower()):
+                embeddings[i, zlib.crc32(word.encode()) % DIMENSION] += 1
+        return embeddings
@@ -0,0 +1,100 @@
+"""
+Batch runner: resume after a crash, restart and malformed lines.
+"""
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.batch import run_batch
+
+
+class Crash(BaseException):
+    """Simulated process death (not caught as a failed conversation)."""
+
+
+class FakeGraph:
+    """Echoes each message; dies on a chosen message to simulate a crash."""
+
+    def __init__(self, crash_on=None):
+        self.crash_on = crash_on
+
+    def invoke(self, state):
+        message = state['messages'][-1].content
+        if message == self.crash_on:
+            raise Crash()
+        state['messages'].append(AIMessage(content=f"echo: {message}"))
+        state['intent'] = 'inquiry'
+        return state
+
+
+def write_transcripts(path, count):
+    """Write `count` one-turn conversations."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'conversation_id': f"c{i}", 'turns': [f"message {i}"]}) + "\n")
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def run(tmp_path, graph, **options):
+    return run_batch(
+        tmp_path / "in.jsonl",
+        tmp_path / "out.jsonl",
+        workers=1,
+        analytics_file=str(tmp_path / "analytics.jsonl"),
+        graph=graph,
+        **options
+    )
+
+
+def test_resume_after_crash_logs_each_conversation_once(tmp_path):
+    write_transcripts(tmp_path / "in.jsonl", 10)
+
+    with pytest.raises(Crash):
+        run(tmp_path, FakeGraph(crash_on="message 6"), checkpoint_every=1000)
+    summary = run(tmp_path, FakeGraph())
+
+    results = read_jsonl(tmp_path / "out.jsonl")
+    assert sorted(r['index'] for r in results) == list(range(10))
+    # Which conversations around the crash got written depends on timing
+    assert summary['skipped'] > 0
+    assert summary['skipped'] + summary['processed'] == 10
+    sessions = read_jsonl(tmp_path / "analytics.jsonl")
+    assert sorted(s['index'] for s in sessions) == list(range(10))
+
+
+def test_restart_keeps_other_runs_analytics(tmp_path):
+    write_transcripts(tmp_path / "in.jsonl", 3)
+    other = tmp_path / "other"
+    other.mkdir()
+    write_transcripts(other / "in.jsonl", 2)
+    run_batch(other / "in.jsonl", other / "out.jsonl", workers=1,
+              analytics_file=str(tmp_path / "analytics.jsonl"), graph=FakeGraph())
+
+    run(tmp_path, FakeGraph())
+    run(tmp_path, FakeGraph(), restart=True)
+
+    sessions = read_jsonl(tmp_path / "analytics.jsonl")
+    assert len(sessions) == 5
+    assert len({s['run_id'] for s in sessions}) == 2
+    assert len(read_jsonl(tmp_path / "out.jsonl")) == 3
+
+
+def test_non_object_line_fails_only_itself(tmp_path):
+    with open(tmp_path / "in.jsonl", 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'conversation_id': "a", 'turns': ["hi"]}) + "\n")
+        f.write("[1, 2]\n")
+        f.write(json.dumps({'conversation_id': "b", 'turns': ["hi"]}) + "\n")
+
+    summary = run(tmp_path, FakeGraph())
+
+    assert summary['processed'] == 3
+    assert summary['failed'] == 1
+    results = {r['conversation_id']: r for r in read_jsonl(tmp_path / "out.jsonl")}
+    assert "Expected a JSON object" in results['line-1']['error']
+    assert results['b']['turns'][0]['agent'] == "echo: hi"
+    assert len(read_jsonl(tmp_path / "analytics.jsonl")) == 2
@@ -0,0 +1,62 @@
+"""
+Context packing and the retrieval-only direct answer.
+"""
+from app.rag.context import pack_context, direct_answer
+
+
+PRO = "Pro Plan: $79/month, unlimited videos, 4K resolution, AI captions"
+BASIC = "Basic Plan: $29/month, 10 videos per month, 720p resolution"
+REFUND = "Refund Policy: No refunds after 7 days"
+
+
+def doc(content, score):
+    return {'content': content, 'metadata': {}, 'score': score}
+
+
+def test_pack_orders_by_score_and_drops_weak_matches():
+    packed = pack_context([doc(BASIC, 0.5), doc(REFUND, 0.1), doc(PRO, 0.9)], min_score=0.3)
+
+    assert [d['content'] for d in packed['documents']] == [PRO, BASIC]
+    assert packed['context'] == f"{PRO}\n\n{BASIC}"
+
+
+def test_pack_keeps_best_match_even_below_cutoff():
+    packed = pack_context([doc(REFUND, 0.1)], min_score=0.3)
+
+    assert [d['content'] for d in packed['documents']] == [REFUND]
+
+
+def test_pack_skips_near_duplicates():
+    copy = PRO + "!"
+    packed = pack_context([doc(PRO, 0.9), doc(copy, 0.85), doc(BASIC, 0.5)], dedup_threshold=0.8)
+
+    assert [d['content'] for d in packed['documents']] == [PRO, BASIC]
+
+
+def test_pack_respects_token_budget():
+    long_doc = "word " * 200  # ~250 tokens
+    packed = pack_context([doc(PRO, 0.9), doc(long_doc, 0.8), doc(BASIC, 0.7)], token_budget=50)
+
+    # The long document would overflow the budget; the smaller one still fits
+    assert [d['content'] for d in packed['documents']] == [PRO, BASIC]
+
+
+def test_pack_empty_results():
+    assert pack_context([]) == {'documents': [], 'context': ""}
+
+
+def test_direct_answer_for_clear_winner():
+    packed = pack_context([doc(PRO, 0.9), doc(BASIC, 0.5)])
+
+    assert direct_answer("Pro plan resolution?", packed) == PRO
+
+
+def test_no_direct_answer_when_unsure():
+    close = pack_context([doc(PRO, 0.9), doc(BASIC, 0.85)])
+    weak = pack_context([doc(PRO, 0.5)])
+    confident = pack_context([doc(PRO, 0.9)])
+
+    assert direct_answer("Pro plan resolution?", close) is None
+    assert direct_answer("Pro plan resolution?", weak) is None
+    assert direct_answer("Does Pro include team seats?", confident) is None
+    assert direct_answer("Pro plan?", pack_context([])) is None
@@ -0,0 +1,78 @@
+"""
+Offline index builder: shard resume, corpus changes and merging.
+"""
+import json
+
+from app.rag.index_builder import build_shards, merge_shards, load_index
+
+
+def write_corpus(path, count, start=0):
+    """Write (or append) `count` numbered documents."""
+    with open(path, 'a', encoding='utf-8') as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({'content': f"document {i} about plans", 'metadata': {'n': i}}) + "\n")
+
+
+def build(corpus, shard_dir, index_dir):
+    """Build and merge with small shards and one worker."""
+    stats = build_shards(str(corpus), shard_dir, workers=1, shard_size=10)
+    manifest = merge_shards(shard_dir, index_dir, shard_count=stats['shards'])
+    return stats, manifest
+
+
+def test_build_and_load(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, 25)
+
+    stats, manifest = build(corpus, tmp_path / "shards", tmp_path / "index")
+
+    assert stats['shards'] == 3
+    assert stats['embedded'] == 25
+    _, documents, embeddings = load_index(str(tmp_path / "index"))
+    assert [doc['metadata']['n'] for doc in documents] == list(range(25))
+    assert embeddings.shape[0] == manifest['documents'] == 25
+
+
+def test_resume_reembeds_only_missing_shards(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, 25)
+    shard_dir = tmp_path / "shards"
+    build(corpus, shard_dir, tmp_path / "index")
+
+    # Interrupted before shard 1 was marked complete
+    (shard_dir / "shard-000001.json").unlink()
+    stats, manifest = build(corpus, shard_dir, tmp_path / "index")
+
+    assert stats['embedded'] == 10
+    assert stats['skipped'] == 15
+    assert manifest['documents'] == 25
+
+
+def test_grown_corpus_reembeds_changed_shards(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, 23)
+    shard_dir = tmp_path / "shards"
+    build(corpus, shard_dir, tmp_path / "index")
+
+    write_corpus(corpus, 2, start=23)
+    stats, manifest = build(corpus, shard_dir, tmp_path / "index")
+
+    # The partial last shard changed; the two full shards are reused
+    assert stats['skipped'] == 20
+    assert stats['embedded'] == 5
+    assert manifest['documents'] == 25
+
+
+def test_shrunk_corpus_drops_stale_shards(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    write_corpus(corpus, 25)
+    shard_dir = tmp_path / "shards"
+    build(corpus, shard_dir, tmp_path / "index")
+
+    corpus.unlink()
+    write_corpus(corpus, 12)
+    stats, manifest = build(corpus, shard_dir, tmp_path / "index")
+
+    assert stats['stale_removed'] == 1
+    assert manifest['documents'] == 12
+    assert merge_shards(shard_dir, tmp_path / "index2")['documents'] == 12
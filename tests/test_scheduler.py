@@ -0,0 +1,149 @@
+"""
+LLMScheduler behaviour against the fake LLM: rate limiting, retries,
+circuit breaking, hedging and deadlines.
+"""
+import time
+
+import pytest
+
+from app.llm.budget import turn_budget
+from app.llm.fake import FakeLLM
+from app.llm.scheduler import (
+    LLMScheduler, LLMError, LLMTimeoutError, LLMCapacityError, CircuitOpenError
+)
+
+
+def make_scheduler(fake, **options):
+    """Scheduler routing every call to one fake client."""
+    settings = {
+        'rate_per_minute': 1_000_000,
+        'timeout': 1.0,
+        'max_retries': 0,
+        'backoff_base': 0.01,
+        'backoff_max': 0.02,
+        'hedge_after': None
+    }
+    settings.update(options)
+    return LLMScheduler(client_factory=lambda temperature: fake, **settings)
+
+
+def test_rate_limit_rejections_do_not_open_circuit():
+    fake = FakeLLM()
+    scheduler = make_scheduler(fake, rate_per_minute=15, burst=2, timeout=0.2, failure_threshold=3)
+
+    outcomes = []
+    for _ in range(10):
+        try:
+            scheduler.invoke("hi")
+            outcomes.append('ok')
+        except LLMCapacityError:
+            outcomes.append('capacity')
+
+    assert outcomes == ['ok'] * 2 + ['capacity'] * 8
+    assert fake.calls == 2
+    metrics = scheduler.get_metrics()
+    assert metrics['circuit_state'] == 'closed'
+    assert metrics['capacity_rejections'] == 8
+    assert metrics['failures'] == 8
+
+
+def test_capacity_rejection_during_probe_keeps_circuit_usable():
+    fake = FakeLLM(error_rate=1.0)
+    scheduler = make_scheduler(fake, failure_threshold=1, reset_timeout=0.05, timeout=0.1)
+
+    with pytest.raises(LLMError):
+        scheduler.invoke("hi")
+    assert scheduler.get_metrics()['circuit_state'] == 'open'
+
+    # The half-open probe is starved of a slot instead of reaching the provider
+    time.sleep(0.1)
+    for _ in range(4):
+        scheduler.slots.acquire()
+    with pytest.raises(LLMCapacityError):
+        scheduler.invoke("hi")
+    for _ in range(4):
+        scheduler.slots.release()
+
+    fake.error_rate = 0.0
+    assert scheduler.invoke("hi").content
+    assert scheduler.get_metrics()['circuit_state'] == 'closed'
+
+
+def test_hung_provider_opens_circuit():
+    fake = FakeLLM(latency=1.0)
+    scheduler = make_scheduler(fake, max_in_flight=2, failure_threshold=3, timeout=0.1)
+
+    for _ in range(2):
+        with pytest.raises(LLMTimeoutError):
+            scheduler.invoke("hi")
+
+    # Both slots are held by abandoned requests: fail fast as a provider timeout
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        scheduler.invoke("hi")
+    assert time.monotonic() - started < 0.05
+
+    with pytest.raises(CircuitOpenError):
+        scheduler.invoke("hi")
+    assert scheduler.get_metrics()['capacity_rejections'] == 0
+
+
+def test_retries_then_fails():
+    fake = FakeLLM(error_rate=1.0)
+    scheduler = make_scheduler(fake, max_retries=2, failure_threshold=10)
+
+    with pytest.raises(LLMError):
+        scheduler.invoke("hi")
+
+    assert fake.calls == 3
+    metrics = scheduler.get_metrics()
+    assert metrics['retries'] == 2
+    assert metrics['failures'] == 1
+
+
+def test_circuit_opens_and_recovers():
+    fake = FakeLLM(error_rate=1.0)
+    scheduler = make_scheduler(fake, failure_threshold=2, reset_timeout=0.1)
+
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            scheduler.invoke("hi")
+    with pytest.raises(CircuitOpenError):
+        scheduler.invoke("hi")
+    assert fake.calls == 2
+
+    # After the reset timeout a successful probe closes the circuit
+    fake.error_rate = 0.0
+    time.sleep(0.15)
+    assert scheduler.invoke("hi").content
+    assert scheduler.get_metrics()['circuit_state'] == 'closed'
+
+
+def test_hedge_beats_slow_primary():
+    latencies = iter([0.5, 0.0])
+    fake = FakeLLM(latency=lambda: next(latencies, 0.0))
+    scheduler = make_scheduler(fake, hedge_after=0.05)
+
+    started = time.monotonic()
+    scheduler.invoke("hi")
+
+    assert time.monotonic() - started < 0.4
+    metrics = scheduler.get_metrics()
+    assert metrics['hedges'] == 1
+    assert metrics['hedge_wins'] == 1
+
+
+def test_deadline_counts_timeout_and_failure():
+    fake = FakeLLM(latency=0.3)
+    scheduler = make_scheduler(fake, timeout=0.05)
+
+    with pytest.raises(LLMTimeoutError):
+        scheduler.invoke("hi")
+    with turn_budget(0):
+        with pytest.raises(LLMTimeoutError):
+            scheduler.invoke("hi")
+
+    metrics = scheduler.get_metrics()
+    assert metrics['timeouts'] == 2
+    assert metrics['failures'] == 2
+    assert fake.calls == 1
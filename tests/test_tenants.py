@@ -0,0 +1,64 @@
+"""
+Tenant registry: LRU eviction under the memory budget.
+"""
+import json
+
+import numpy as np
+
+from app.rag.tenants import TenantRegistry
+
+
+def write_kb(path, tenant):
+    """Write a small knowledge base with tenant-specific wording."""
+    data = {
+        'plans': {
+            'basic': {'name': f"{tenant} Basic", 'description': f"{tenant} basic plan with 720p exports"},
+            'pro': {'name': f"{tenant} Pro", 'description': f"{tenant} pro plan with 4K exports"}
+        },
+        'policies': {
+            'refund': {'title': "Refunds", 'description': f"{tenant} refunds within 7 days"}
+        }
+    }
+    with open(path / f"{tenant}.json", 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def make_registry(tmp_path, tenants, resident):
+    """Registry over `tenants` whose budget fits exactly `resident` fresh indexes."""
+    for tenant in tenants:
+        write_kb(tmp_path, tenant)
+    registry = TenantRegistry(kb_dir=str(tmp_path))
+    size = registry.get(tenants[0]).memory_bytes()
+    registry.memory_budget = size * resident
+    return registry
+
+
+def test_least_recently_used_tenant_is_evicted(tmp_path):
+    registry = make_registry(tmp_path, ['a', 'b', 'c'], resident=2)
+
+    registry.get('b')
+    registry.get('a')  # b is now least recently used
+    registry.get('c')
+
+    metrics = registry.get_metrics()
+    assert list(registry.retrievers) == ['a', 'c']
+    assert metrics['tenants']['b']['evictions'] == 1
+    assert metrics['memory_bytes'] <= metrics['memory_budget_bytes']
+
+    registry.get('b')  # reloads, evicting a
+    assert list(registry.retrievers) == ['c', 'b']
+    assert registry.get_metrics()['tenants']['b']['loads'] == 2
+
+
+def test_query_cache_growth_counts_against_budget(tmp_path):
+    registry = make_registry(tmp_path, ['a', 'b'], resident=2)
+    retriever = registry.get('a')
+    registry.get('b')
+
+    retriever.prime_query_cache({
+        f"question {i}": np.ones(retriever.embeddings.shape[1]) for i in range(50)
+    })
+    registry.get('a')
+
+    assert list(registry.retrievers) == ['a']
+    assert registry.sizes['a'] == retriever.memory_bytes() > retriever.index_bytes